@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, AsyncIterator, List
 
 class AIProvider(ABC):
     @abstractmethod
@@ -8,4 +8,25 @@ class AIProvider(ABC):
 
     @abstractmethod
     async def initialize(self) -> None:
-        pass 
\ No newline at end of file
+        pass
+
+    async def stream_response(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        """Yield the response in text chunks; providers without streaming yield it whole"""
+        yield await self.generate_response(prompt, **kwargs)
+
+    async def expand_node(self, prompt: str, path: List[str], existing: List[str], **kwargs) -> Any:
+        """Generate the children of one roadmap node, formatted like generate_response
+
+        ``path`` holds the titles from the top-level topic down to the node,
+        ``existing`` the titles of the children it already has.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot expand roadmap nodes")
+
+    @classmethod
+    def can_expand(cls) -> bool:
+        """Whether the provider implements expand_node"""
+        return cls.expand_node is not AIProvider.expand_node
+
+    async def shutdown(self) -> None:
+        """Release clients and connections held by the provider"""
+        pass
@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+KEYWORDS_PATH = os.path.join(os.path.dirname(__file__), "data", "career_keywords.json")
+
+_WHITESPACE = re.compile(r'\s+')
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+class Classification(NamedTuple):
+    is_tech: bool
+    language: str
+
+def normalize_prompt(text: str) -> str:
+    """Fold case, accents and whitespace so equivalent prompts compare equal"""
+    if text.isascii():
+        return _WHITESPACE.sub(' ', text.lower()).strip()
+    decomposed = unicodedata.normalize('NFKD', text)
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _WHITESPACE.sub(' ', without_accents.casefold()).strip()
+
+class _Matcher:
+    """Longest-match phrase automaton over the tokens of a normalized prompt
+
+    Keywords only match whole tokens, optionally with a plural ending on
+    the last word, and multi-word keywords also match written as one word
+    ("full stack", "full-stack", "fullstack"). Every token costs one
+    dictionary lookup; only words that start a multi-word keyword try the
+    longer phrases.
+    """
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Phrase -> (language, is_tech); tech keywords win over hints spelled the same way
+        self.phrases: Dict[str, Tuple[str, bool]] = {}
+        # First word -> word count of the longest multi-word phrase starting with it
+        self.starts: Dict[str, int] = {}
+        for group, is_tech in (("language_hints", False), ("tech", True)):
+            for language, keywords in data[group].items():
+                for keyword in keywords:
+                    words = _TOKEN.findall(normalize_prompt(keyword))
+                    self.phrases[' '.join(words)] = (language, is_tech)
+                    self.phrases[''.join(words)] = (language, is_tech)
+                    if len(words) > 1:
+                        self.starts[words[0]] = max(self.starts.get(words[0], 0), len(words))
+
+    def _get(self, phrase: str, last_word: str) -> Optional[Tuple[str, bool]]:
+        entry = self.phrases.get(phrase)
+        if entry is None and last_word[-1] == 's':
+            # Plural ending on the last word: "developers", "desarrolladores"
+            entry = self.phrases.get(phrase[:-1])
+            if entry is None and last_word.endswith('es'):
+                entry = self.phrases.get(phrase[:-2])
+        return entry
+
+    def scan(self, normalized: str) -> List[Tuple[str, bool]]:
+        tokens = _TOKEN.findall(normalized)
+        count = len(tokens)
+        matches = []
+        i = 0
+        while i < count:
+            token = tokens[i]
+            step = 1
+            entry = None
+            longest = self.starts.get(token)
+            if longest:
+                for length in range(min(longest, count - i), 1, -1):
+                    entry = self._get(' '.join(tokens[i:i + length]), tokens[i + length - 1])
+                    if entry is not None:
+                        step = length
+                        break
+            if entry is None:
+                entry = self._get(token, token)
+            if entry is not None:
+                matches.append(entry)
+            i += step
+        return matches
+
+_MATCHER = _Matcher(KEYWORDS_PATH)
+
+@lru_cache(maxsize=4096)
+def classify(text: str) -> Classification:
+    """Tech career check and English/Spanish detection in a single scan of the prompt"""
+    is_tech = False
+    spanish_career = False
+    scores = {"en": 0, "es": 0, "neutral": 0}
+    for language, tech_keyword in _MATCHER.scan(normalize_prompt(text)):
+        scores[language] += 1
+        is_tech = is_tech or tech_keyword
+        spanish_career = spanish_career or (tech_keyword and language == "es")
+    # Like before, a Spanish career word ("I want to be a desarrollador") or
+    # any Spanish evidence in a tie means Spanish
+    spanish = spanish_career or (scores["es"] and scores["es"] >= scores["en"])
+    language = "es" if spanish else "en"
+    return Classification(is_tech, language)
+
+def detect_language(text: str) -> str:
+    """Detect if the input is in Spanish or English"""
+    return classify(text).language
+
+def is_tech_career(prompt: str) -> bool:
+    """Check if the input is related to a tech career"""
+    return classify(prompt).is_tech
@@ -1,19 +1,85 @@
-from typing import Dict, Type
+import importlib
+from typing import Dict, Iterable, List, Optional, Type, Union
 from app.ai_integration.base import AIProvider
-from app.ai_integration.providers.langchain_llm import LangchainLLMProvider
+from app.core.settings import get_settings
 
 class AIProviderFactory:
-    _providers: Dict[str, Type[AIProvider]] = {
-        "langchain": LangchainLLMProvider
+    # "module:Class" paths are imported on first use, so langchain/openai
+    # are only loaded by workers that actually use them
+    _providers: Dict[str, Union[str, Type[AIProvider]]] = {
+        "langchain": "app.ai_integration.providers.langchain_llm:LangchainLLMProvider",
+        "langchain-fallback": "app.ai_integration.providers.langchain_llm:LangchainFallbackProvider",
+        "template": "app.ai_integration.providers.your_custom_llm:TemplateRoadmapProvider"
     }
+    # One live instance per provider and worker process
+    _instances: Dict[str, AIProvider] = {}
 
     @classmethod
-    def get_provider(cls, provider_name: str) -> AIProvider:
+    def get_provider(cls, provider_name: Optional[str] = None) -> AIProvider:
+        provider_name = provider_name or get_settings().AI_PROVIDER
+        instance = cls._instances.get(provider_name)
+        if instance is None:
+            instance = cls.get_provider_class(provider_name)()
+            cls._instances[provider_name] = instance
+        return instance
+
+    @classmethod
+    def get_provider_class(cls, provider_name: str) -> Type[AIProvider]:
         provider_class = cls._providers.get(provider_name)
         if not provider_class:
             raise ValueError(f"Provider {provider_name} not found")
-        return provider_class()
+        if isinstance(provider_class, str):
+            module_name, _, class_name = provider_class.partition(":")
+            provider_class = getattr(importlib.import_module(module_name), class_name)
+            cls._providers[provider_name] = provider_class
+        return provider_class
+
+    @classmethod
+    def register_provider(cls, name: str, provider_class: Union[str, Type[AIProvider]]):
+        cls._providers[name] = provider_class
+        cls._instances.pop(name, None)
+
+    @classmethod
+    def configured_providers(cls) -> List[str]:
+        """AI_PROVIDER followed by the AI_FALLBACK_PROVIDERS, in order"""
+        settings = get_settings()
+        names = [settings.AI_PROVIDER]
+        for name in settings.AI_FALLBACK_PROVIDERS.split(","):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    @classmethod
+    def startup_providers(cls) -> List[str]:
+        """The configured providers plus the degrade provider"""
+        names = cls.configured_providers()
+        degrade_provider = get_settings().AI_DEGRADE_PROVIDER
+        if degrade_provider and degrade_provider not in names:
+            names.append(degrade_provider)
+        return names
+
+    @classmethod
+    def preload(cls, provider_names: Optional[Iterable[str]] = None) -> None:
+        """Import provider modules without creating clients, e.g. in the gunicorn master before forking"""
+        for name in provider_names or cls.startup_providers():
+            cls.get_provider_class(name)
+
+    @classmethod
+    async def startup(cls, provider_names: Optional[Iterable[str]] = None) -> None:
+        """Create and warm up providers once per worker"""
+        if provider_names is None:
+            provider_names = cls.startup_providers()
+        for name in provider_names:
+            await cls.get_provider(name).initialize()
 
     @classmethod
-    def register_provider(cls, name: str, provider_class: Type[AIProvider]):
-        cls._providers[name] = provider_class 
\ No newline at end of file
+    async def shutdown(cls) -> None:
+        """Close provider clients on application shutdown"""
+        instances = list(cls._instances.values())
+        cls._instances.clear()
+        for provider in instances:
+            try:
+                await provider.shutdown()
+            except Exception as e:
+                print(f"Error shutting down AI provider: {str(e)}")
@@ -1,150 +1,74 @@
-from typing import Dict, Any
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional
 import json
+import httpx
 from langchain.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from ..base import AIProvider
+from ..classifier import detect_language, is_tech_career
+from ..validation import get_error_message, validate_prompt
 from app.core.settings import get_settings
+from app.schemas.chat import GeneratedRoadmap
 
 class LangchainLLMProvider(AIProvider):
     def __init__(self):
         self.settings = get_settings()
+        self.model = self.settings.OPENAI_MODEL
         self.llm = None
-        # Keywords in both English and Spanish
-        self.tech_keywords = [
-            # English keywords
-            "developer", "programmer", "coder", "engineer", "architect",
-            "software", "web", "app", "mobile", "cloud", "data", "ai", "ml",
-            "devops", "security", "cyber", "blockchain", "game",
-            "frontend", "backend", "full-stack", "fullstack", "full stack",
-            "qa", "tester", "analyst", "administrator", "designer",
-            "python", "javascript", "java", "react", "angular", "vue",
-            "node", "aws", "azure", "google cloud", "docker", "kubernetes",
-            "computer science", "programming", "coding", "development",
-            "software engineering", "web development", "data science",
-            # Spanish keywords
-            "desarrollador", "programador", "ingeniero", "arquitecto",
-            "desarrollo", "aplicaciones", "móvil", "nube", "datos", "seguridad",
-            "pruebas", "analista", "administrador", "diseñador",
-            "ciencias de la computación", "programación", "desarrollo web",
-            "ciencia de datos", "inteligencia artificial", "aprendizaje automático",
-            "ciberseguridad", "computación", "sistemas", "redes"
-        ]
+        self.http_client = None
 
     def _is_tech_career(self, prompt: str) -> bool:
         """Check if the input is related to a tech career"""
-        # Convert prompt to lowercase for case-insensitive matching
-        prompt_lower = prompt.lower()
-        
-        # Check for exact matches first
-        if any(keyword == prompt_lower for keyword in self.tech_keywords):
-            return True
-            
-        # Check for partial matches
-        if any(keyword in prompt_lower for keyword in self.tech_keywords):
-            return True
-            
-        # Check for compound terms
-        words = prompt_lower.split()
-        if len(words) > 1:
-            if any(word in self.tech_keywords for word in words):
-                return True
-                
-        return False
+        return is_tech_career(prompt)
 
     def _detect_language(self, text: str) -> str:
         """Detect if the input is in Spanish or English"""
-        spanish_indicators = [
-            "desarrollador", "programador", "ingeniero", "desarrollo",
-            "aplicaciones", "móvil", "datos", "seguridad", "computación"
-        ]
-        
-        text_lower = text.lower()
-        for indicator in spanish_indicators:
-            if indicator in text_lower:
-                return "es"
-        return "en"
+        return detect_language(text)
 
     def _get_error_message(self, prompt: str) -> Dict:
-        language = self._detect_language(prompt)
-        
-        if language == "es":
-            return {
-                "data": {
-                    "id": "error",
-                    "title": "Carrera No Válida",
-                    "description": (
-                        "🤖 ¡Hola! Soy TechBot, tu asesor en carreras tecnológicas.\n\n"
-                        "Me especializo en crear rutas de aprendizaje para carreras como:\n"
-                        "• Desarrollo de Software (Frontend, Backend, Full Stack)\n"
-                        "• Ciencia de Datos e Ingeniería de IA/ML\n"
-                        "• Ingeniería DevOps y Cloud\n"
-                        "• Ciberseguridad y Redes\n"
-                        "• QA y Testing de Software\n\n"
-                        f"He notado que '{prompt}' podría no ser una carrera tecnológica. "
-                        "¡Por favor, intenta de nuevo con una carrera relacionada con tecnología!\n\n"
-                        "Ejemplo: 'Desarrollador Frontend' o 'Científico de Datos'"
-                    ),
-                    "resources": [
-                        {
-                            "title": "Guía de Carreras Tech",
-                            "url": "https://roadmap.sh",
-                            "type": "article"
-                        }
-                    ],
-                    "children": []
-                }
-            }
-        else:
-            return {
-                "data": {
-                    "id": "error",
-                    "title": "Invalid Career Path",
-                    "description": (
-                        "🤖 Hello! I'm TechBot, your technology career advisor.\n\n"
-                        "I specialize in creating learning paths for technology careers such as:\n"
-                        "• Software Development (Frontend, Backend, Full Stack)\n"
-                        "• Data Science & AI/ML Engineering\n"
-                        "• Cloud & DevOps Engineering\n"
-                        "• Cybersecurity & Network Engineering\n"
-                        "• QA & Software Testing\n\n"
-                        f"I noticed that '{prompt}' might not be a tech career. "
-                        "Please try again with a technology-related role!\n\n"
-                        "Example: 'Frontend Developer' or 'Data Scientist'"
-                    ),
-                    "resources": [
-                        {
-                            "title": "Tech Career Guide",
-                            "url": "https://roadmap.sh",
-                            "type": "article"
-                        }
-                    ],
-                    "children": []
-                }
-            }
+        return get_error_message(prompt)
 
     async def initialize(self) -> None:
+        if self.llm:
+            return
+        # Pooled keep-alive client shared by every request on this worker
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.settings.AI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=self.settings.AI_HTTP_MAX_KEEPALIVE
+            ),
+            timeout=self.settings.AI_REQUEST_TIMEOUT
+        )
         self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo-16k",
+            model=self.model,
             temperature=0.2,
-            openai_api_key=self.settings.OPENAI_API_KEY
+            openai_api_key=self.settings.OPENAI_API_KEY,
+            request_timeout=self.settings.AI_REQUEST_TIMEOUT,
+            http_async_client=self.http_client
         )
 
-    async def generate_response(self, prompt: str, **kwargs) -> Any:
-        if not self.llm:
-            await self.initialize()
-
-        # Input validation
-        if not prompt or len(prompt.strip()) < 2:
-            return self._get_error_message("empty input")
-
-        # Check for non-tech inputs
-        if not self._is_tech_career(prompt):
-            return self._get_error_message(prompt)
-
-        # Detect language
-        language = self._detect_language(prompt)
-        
-        system_prompt = """You are an expert technical mentor creating learning paths for technology careers.
+    async def shutdown(self) -> None:
+        self.llm = None
+        if self.http_client:
+            await self.http_client.aclose()
+            self.http_client = None
+
+    def _validate_prompt(self, prompt: str) -> Optional[Dict]:
+        """Return the error roadmap for inputs that should not reach the LLM"""
+        return validate_prompt(prompt)
+
+    def _build_prompt(self, prompt: str, structured: bool = False) -> str:
+        if structured:
+            # The tool schema carries the format, so only the content rules are sent
+            system_prompt = """You are an expert technical mentor creating learning paths for technology careers.
+Call the GeneratedRoadmap tool with a practical learning path:
+- 2-3 main topics with 1-2 children each, fundamentals first
+- Titles of 2-3 words, one-line descriptions
+- One real, accessible resource per node from well-known platforms (MDN, freeCodeCamp, Udemy, etc.),
+  typed as article, video or course, preferring free ones
+Write every title and description in the same language as the user's input (Spanish or English)."""
+        else:
+            system_prompt = """You are an expert technical mentor creating learning paths for technology careers.
 You must respond in the same language as the user's input (Spanish or English).
 Create a structured, practical learning path following these rules:
 
@@ -179,10 +103,99 @@ IMPORTANT: Respond in the same language as the input prompt."""
             ("system", system_prompt),
             ("user", user_prompt)
         ])
+        return prompt_template.format()
+
+    async def generate_response(self, prompt: str, **kwargs) -> Any:
+        if not self.llm:
+            await self.initialize()
+
+        error = self._validate_prompt(prompt)
+        if error:
+            return error
 
         try:
-            response = self.llm.invoke(prompt_template.format())
+            if kwargs.get("response_format") == "json":
+                return await self._generate_structured(self._build_prompt(prompt, structured=True))
+            response = await self.llm.ainvoke(self._build_prompt(prompt))
             return response.content
         except Exception as e:
             print(f"Error getting AI response: {str(e)}")
-            raise ValueError(f"Failed to generate learning path: {str(e)}") 
\ No newline at end of file
+            raise ValueError(f"Failed to generate learning path: {str(e)}")
+
+    async def _generate_structured(self, messages: str) -> str:
+        """Ask for a GeneratedRoadmap tool call and return its raw JSON arguments"""
+        llm = self.llm.bind_tools([GeneratedRoadmap], tool_choice="GeneratedRoadmap")
+        response = await llm.ainvoke(messages)
+        tool_calls = response.additional_kwargs.get("tool_calls") or []
+        if tool_calls:
+            return tool_calls[0]["function"]["arguments"]
+        # The model answered in plain text; AIService falls back to the text parser
+        return response.content
+
+    def _build_expand_prompt(
+        self, prompt: str, path: List[str], existing: List[str], structured: bool = False
+    ) -> str:
+        if structured:
+            format_rules = "Call the GeneratedRoadmap tool with the subtopics as topics and no subtopics of their own."
+        else:
+            format_rules = """Format each subtopic exactly as shown:
+1. Subtopic Name (2-3 words maximum)
+   - Brief, clear description (one line)
+   - Resource: [Resource Name] https://real-url.com"""
+        system_prompt = f"""You are an expert technical mentor extending an existing learning path.
+List 2-4 subtopics that go one level deeper into the given topic, fundamentals first.
+{format_rules}
+Include only real, accessible resources from well-known platforms, preferring free ones.
+Respond in the same language as the learning path and topic names (Spanish or English)."""
+
+        # An empty path expands the roadmap itself with more main topics
+        user_prompt = f"Learning path: {prompt}\nTopic: {' > '.join(path) or prompt}"
+        if existing:
+            user_prompt += f"\nAlready covered, do not repeat: {', '.join(existing)}"
+
+        prompt_template = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("user", user_prompt)
+        ])
+        return prompt_template.format()
+
+    async def expand_node(self, prompt: str, path: List[str], existing: List[str], **kwargs) -> Any:
+        if not self.llm:
+            await self.initialize()
+
+        try:
+            if kwargs.get("response_format") == "json":
+                return await self._generate_structured(
+                    self._build_expand_prompt(prompt, path, existing, structured=True)
+                )
+            response = await self.llm.ainvoke(self._build_expand_prompt(prompt, path, existing))
+            return response.content
+        except Exception as e:
+            print(f"Error expanding roadmap node: {str(e)}")
+            raise ValueError(f"Failed to expand learning path: {str(e)}")
+
+    async def stream_response(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        if not self.llm:
+            await self.initialize()
+
+        error = self._validate_prompt(prompt)
+        if error:
+            yield error
+            return
+
+        try:
+            # Closing this generator closes the upstream stream as well
+            async with aclosing(self.llm.astream(self._build_prompt(prompt))) as chunks:
+                async for chunk in chunks:
+                    if chunk.content:
+                        yield chunk.content
+        except Exception as e:
+            print(f"Error streaming AI response: {str(e)}")
+            raise ValueError(f"Failed to generate learning path: {str(e)}")
+
+class LangchainFallbackProvider(LangchainLLMProvider):
+    """Same prompts on a second OpenAI model, used for fallback and hedged requests"""
+
+    def __init__(self):
+        super().__init__()
+        self.model = self.settings.OPENAI_FALLBACK_MODEL
@@ -1,10 +1,139 @@
+from typing import Any, Dict, List, Tuple
+import json
+import os
+import re
 from ..base import AIProvider
+from ..classifier import detect_language, normalize_prompt
+from ..validation import validate_prompt
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), "data", "roadmap_templates.json")
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Role words shared by every career never decide a match on their own
+GENERIC_TOKENS = {
+    "developer", "engineer", "engineering", "development", "analyst", "de", "la", "el",
+    "desarrollador", "desarrollo", "ingeniero", "ingenieria", "analista", "a", "an", "the"
+}
+
+# Words the text parser looks for to recover the resource type
+_TYPE_HINTS = {"video": " (video)", "course": " (course)"}
+
+class TemplateRoadmapProvider(AIProvider):
+    """Offline provider that assembles roadmaps from a bundled template catalog
+
+    Every (career, language, format) answer is rendered once at load time,
+    so a request costs a dictionary lookup plus the career match and never
+    leaves the process. AIService uses it as the degrade provider when the
+    LLM is overloaded or failing; it can also be listed as a regular provider.
+    """
+
+    def __init__(self, path: str = TEMPLATES_PATH):
+        self.path = path
+        self.version = None
+        self.default_career = None
+        self.careers: List[str] = []
+        # Exact normalized alias -> career, then non-generic alias token -> careers
+        self.aliases: Dict[str, str] = {}
+        self.token_index: Dict[str, List[str]] = {}
+        self.rendered: Dict[Tuple[str, str, str], str] = {}
 
-class CustomLLMProvider(AIProvider):
     async def initialize(self) -> None:
-        # Initialize your custom LLM here
-        pass
+        if not self.rendered:
+            self.load()
+
+    def load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            catalog = json.load(f)
+
+        aliases: Dict[str, str] = {}
+        token_index: Dict[str, List[str]] = {}
+        rendered: Dict[Tuple[str, str, str], str] = {}
+        careers = []
+        for career in catalog["careers"]:
+            key = career["key"]
+            careers.append(key)
+            for names in career["aliases"].values():
+                for alias in names:
+                    alias = normalize_prompt(alias)
+                    aliases.setdefault(alias, key)
+                    for token in _TOKEN.findall(alias):
+                        if token in GENERIC_TOKENS:
+                            continue
+                        matches = token_index.setdefault(token, [])
+                        if key not in matches:
+                            matches.append(key)
+            for language in ("en", "es"):
+                rendered[(key, language, "text")] = self._render_text(career["topics"], language)
+                rendered[(key, language, "json")] = self._render_json(career["topics"], language)
+
+        self.version = catalog.get("version")
+        self.default_career = catalog.get("default") or careers[0]
+        self.careers = careers
+        self.aliases = aliases
+        self.token_index = token_index
+        self.rendered = rendered
+
+    def _render_resource(self, resource: Dict) -> str:
+        hint = _TYPE_HINTS.get(resource["type"], "")
+        return f"- Resource: [{resource['title']}]{hint} {resource['url']}"
+
+    def _render_text(self, topics: List[Dict], language: str) -> str:
+        """Numbered format the LLM is asked for, so RoadmapParser reads it unchanged"""
+        lines = []
+        for number, topic in enumerate(topics, start=1):
+            lines.append(f"{number}. {topic['title'][language]}")
+            lines.append(f"   - {topic['description'][language]}")
+            lines.append(f"   {self._render_resource(topic['resource'])}")
+            for letter, subtopic in zip("abcdefghij", topic.get("subtopics") or []):
+                lines.append(f"   {letter}) {subtopic['title'][language]}")
+                lines.append(f"      - {subtopic['description'][language]}")
+                lines.append(f"      {self._render_resource(subtopic['resource'])}")
+        return "\n".join(lines) + "\n"
+
+    def _node(self, node: Dict, language: str, with_subtopics: bool) -> Dict:
+        result = {
+            "title": node["title"][language],
+            "description": node["description"][language],
+            "resources": [node["resource"]]
+        }
+        if with_subtopics:
+            result["subtopics"] = [
+                self._node(child, language, with_subtopics=False) for child in node.get("subtopics") or []
+            ]
+        return result
+
+    def _render_json(self, topics: List[Dict], language: str) -> str:
+        """GeneratedRoadmap payload, for AI_RESPONSE_FORMAT=json"""
+        return json.dumps(
+            {"topics": [self._node(topic, language, with_subtopics=True) for topic in topics]},
+            ensure_ascii=False
+        )
+
+    def match_career(self, prompt: str) -> str:
+        """Exact alias first, then the career sharing the most alias tokens"""
+        normalized = normalize_prompt(prompt)
+        career = self.aliases.get(normalized)
+        if career:
+            return career
+
+        scores: Dict[str, int] = {}
+        for token in set(_TOKEN.findall(normalized)):
+            for career in self.token_index.get(token, ()):
+                scores[career] = scores.get(career, 0) + 1
+        if not scores:
+            return self.default_career
+        # Ties go to the career listed first in the catalog
+        return max(self.careers, key=lambda key: scores.get(key, 0))
+
+    async def generate_response(self, prompt: str, **kwargs) -> Any:
+        if not self.rendered:
+            self.load()
+
+        error = validate_prompt(prompt)
+        if error:
+            return error
 
-    async def generate_response(self, prompt: str, **kwargs) -> str:
-        # Implement your existing LLM logic here
-        return "Your LLM response" 
\ No newline at end of file
+        response_format = "json" if kwargs.get("response_format") == "json" else "text"
+        career = self.match_career(prompt)
+        return self.rendered[(career, detect_language(prompt), response_format)]
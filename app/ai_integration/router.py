@@ -0,0 +1,181 @@
+import asyncio
+import bisect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+from app.ai_integration.base import AIProvider
+from app.ai_integration.factory import AIProviderFactory
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with interpolated quantiles"""
+
+    BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 45.0, 60.0, 90.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.BUCKETS[i - 1] if i else 0.0
+                upper = self.BUCKETS[i] if i < len(self.BUCKETS) else self.BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.BUCKETS[-1]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95)
+        }
+
+class ProviderUnavailable(Exception):
+    """None of the configured providers supports the requested operation"""
+
+class ProviderRouter:
+    """Run a generation across several registered providers
+
+    Providers are tried in order. In ``fallback`` mode the next provider
+    starts only after the current one failed, timed out or returned an
+    invalid result. In ``hedge`` mode the next provider is also started
+    when the current one is slower than its usual latency (the
+    ``hedge_quantile`` of its histogram, clamped to the configured delays).
+    The first valid result wins and the other attempts are cancelled.
+    """
+
+    def __init__(
+        self,
+        provider_names: List[str],
+        mode: str = "fallback",
+        timeout: float = 45.0,
+        hedge_delay: float = 8.0,
+        hedge_min_delay: float = 1.0,
+        hedge_quantile: float = 0.95,
+        min_samples: int = 20
+    ):
+        self.provider_names = provider_names
+        self.mode = mode
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.latency: Dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in provider_names}
+        self.errors: Dict[str, int] = {name: 0 for name in provider_names}
+        self.wins: Dict[str, int] = {name: 0 for name in provider_names}
+        self.hedges = 0
+
+    def delay_for(self, name: str) -> float:
+        histogram = self.latency[name]
+        if histogram.count < self.min_samples:
+            delay = self.hedge_delay
+        else:
+            delay = histogram.quantile(self.hedge_quantile)
+        return min(max(delay, self.hedge_min_delay), self.timeout)
+
+    async def _attempt(
+        self, name: str, attempt: Callable[[AIProvider], Awaitable[Any]], observe: bool = True
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(attempt(AIProviderFactory.get_provider(name)), self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors[name] += 1
+            raise
+        if observe:
+            self.latency[name].observe(time.perf_counter() - started)
+        return result
+
+    async def run(
+        self,
+        attempt: Callable[[AIProvider], Awaitable[Any]],
+        is_valid: Callable[[Any], bool] = bool,
+        supports: Optional[Callable[[Type[AIProvider]], bool]] = None,
+        observe: bool = True
+    ) -> Any:
+        """First valid result of ``attempt`` across the providers ``supports`` accepts (all by default)
+
+        Pass ``observe=False`` when ``attempt`` does not time a whole generation
+        (e.g. it only waits for a stream's first chunk), so it stays out of the
+        latency histograms that hedge delays are based on.
+        """
+        remaining = [
+            name for name in self.provider_names
+            if supports is None or supports(AIProviderFactory.get_provider_class(name))
+        ]
+        if not remaining:
+            raise ProviderUnavailable("No configured AI provider supports this request")
+        running: Dict[asyncio.Task, str] = {}
+        invalid_results: List[Any] = []
+        last_error: Optional[BaseException] = None
+
+        def launch() -> str:
+            name = remaining.pop(0)
+            running[asyncio.create_task(self._attempt(name, attempt, observe))] = name
+            return name
+
+        current = launch()
+        try:
+            while running:
+                timeout = None
+                if self.mode == "hedge" and remaining:
+                    timeout = self.delay_for(current)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The current attempt is slower than usual: hedge with the next provider
+                    self.hedges += 1
+                    current = launch()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        print(f"AI provider {name} failed: {str(e)}")
+                        last_error = e
+                        continue
+                    if is_valid(result):
+                        self.wins[name] += 1
+                        return result
+                    invalid_results.append(result)
+                if not running and remaining:
+                    current = launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        # Nothing valid came back: prefer an answer over an error
+        if invalid_results or last_error is None:
+            return invalid_results[-1] if invalid_results else None
+        if isinstance(last_error, asyncio.TimeoutError):
+            raise ValueError("Failed to generate learning path: the AI provider timed out")
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "hedges": self.hedges,
+            "providers": {
+                name: {
+                    "latency": self.latency[name].stats(),
+                    "hedge_delay": self.delay_for(name),
+                    "errors": self.errors[name],
+                    "wins": self.wins[name]
+                }
+                for name in self.provider_names
+            }
+        }
@@ -0,0 +1,72 @@
+from typing import Dict, Optional
+from app.ai_integration.classifier import detect_language, is_tech_career
+
+def get_error_message(prompt: str) -> Dict:
+    language = detect_language(prompt)
+    
+    if language == "es":
+        return {
+            "data": {
+                "id": "error",
+                "title": "Carrera No Válida",
+                "description": (
+                    "🤖 ¡Hola! Soy TechBot, tu asesor en carreras tecnológicas.\n\n"
+                    "Me especializo en crear rutas de aprendizaje para carreras como:\n"
+                    "• Desarrollo de Software (Frontend, Backend, Full Stack)\n"
+                    "• Ciencia de Datos e Ingeniería de IA/ML\n"
+                    "• Ingeniería DevOps y Cloud\n"
+                    "• Ciberseguridad y Redes\n"
+                    "• QA y Testing de Software\n\n"
+                    f"He notado que '{prompt}' podría no ser una carrera tecnológica. "
+                    "¡Por favor, intenta de nuevo con una carrera relacionada con tecnología!\n\n"
+                    "Ejemplo: 'Desarrollador Frontend' o 'Científico de Datos'"
+                ),
+                "resources": [
+                    {
+                        "title": "Guía de Carreras Tech",
+                        "url": "https://roadmap.sh",
+                        "type": "article"
+                    }
+                ],
+                "children": []
+            }
+        }
+    else:
+        return {
+            "data": {
+                "id": "error",
+                "title": "Invalid Career Path",
+                "description": (
+                    "🤖 Hello! I'm TechBot, your technology career advisor.\n\n"
+                    "I specialize in creating learning paths for technology careers such as:\n"
+                    "• Software Development (Frontend, Backend, Full Stack)\n"
+                    "• Data Science & AI/ML Engineering\n"
+                    "• Cloud & DevOps Engineering\n"
+                    "• Cybersecurity & Network Engineering\n"
+                    "• QA & Software Testing\n\n"
+                    f"I noticed that '{prompt}' might not be a tech career. "
+                    "Please try again with a technology-related role!\n\n"
+                    "Example: 'Frontend Developer' or 'Data Scientist'"
+                ),
+                "resources": [
+                    {
+                        "title": "Tech Career Guide",
+                        "url": "https://roadmap.sh",
+                        "type": "article"
+                    }
+                ],
+                "children": []
+            }
+        }
+
+def validate_prompt(prompt: str) -> Optional[Dict]:
+    """Return the error roadmap for inputs that should not reach the LLM"""
+    # Input validation
+    if not prompt or len(prompt.strip()) < 2:
+        return get_error_message("empty input")
+
+    # Check for non-tech inputs
+    if not is_tech_career(prompt):
+        return get_error_message(prompt)
+
+    return None
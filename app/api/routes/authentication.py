@@ -5,13 +5,12 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from app.services.database_connection_service import sessionLocal, engine
 from app.schemas.user import User
-from passlib.context import CryptContext
 from pydantic import BaseModel
-from google.auth.transport.requests import Request
-from google.oauth2 import id_token
+from app.core.metrics import span
 from app.core.settings import get_settings
-import requests
-import json
+from app.services.google_auth import get_google_token_verifier
+from app.services.password_hasher import HasherBusy, get_password_hasher
+from app.services.principal_cache import UserSnapshot, get_token_claims_cache, get_user_cache
 
 router = APIRouter()
 settings = get_settings()
@@ -20,7 +19,6 @@ SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class UserCreate(BaseModel):
@@ -39,19 +37,33 @@ def get_db():
         db.close()
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+    cache = get_user_cache()
+    user = cache.get(email)
+    if user is None:
+        with span("db"):
+            row = db.query(User).filter(User.email == email).first()
+        if row is None:
+            return None
+        user = UserSnapshot.from_row(row)
+        cache.put(email, user)
+    return user
 
 def create_user(db: Session, user: UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+    # Do not hold a pooled connection while bcrypt runs
+    db.commit()
+    with span("password"):
+        hashed_password = get_password_hasher().hash(user.password)
     db_user = User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
+    get_user_cache().invalidate(user.email)
     return "User created correctly" 
 
 def create_google_user(db: Session, email: str):
     db_user = User(email=email, hashed_password=None) 
     db.add(db_user)
     db.commit()
+    get_user_cache().invalidate(email)
     return db_user
 
 @router.post("/register")
@@ -62,14 +74,20 @@ def register_user(
     db_user = get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return create_user(db=db, user=user)
+    try:
+        return create_user(db=db, user=user)
+    except HasherBusy as e:
+        raise _hasher_busy(e)
 
 @router.post("/token")
 def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    try:
+        user = authenticate_user(form_data.username, form_data.password, db)
+    except HasherBusy as e:
+        raise _hasher_busy(e)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -108,7 +126,8 @@ async def verify_user_token(token: str):
 async def login_with_google(request: GoogleRequest, db: Session = Depends(get_db)):
     token = request.token
     try:
-        id_info = id_token.verify_oauth2_token(token, Request(), settings.GOOGLE_CLIENT_ID)
+        with span("google"):
+            id_info = await get_google_token_verifier().verify(token)
 
         email = id_info.get("email")
         if email is None:
@@ -154,7 +173,8 @@ async def login_with_google(request: GoogleRequest, db: Session = Depends(get_db
 async def register_with_google(request: GoogleRequest, db: Session = Depends(get_db)):
     token = request.token
     try:
-        id_info = id_token.verify_oauth2_token(token, Request(), get_settings().GOOGLE_CLIENT_ID)
+        with span("google"):
+            id_info = await get_google_token_verifier().verify(token)
 
         email = id_info.get("email")
         if email is None:
@@ -179,13 +199,32 @@ async def register_with_google(request: GoogleRequest, db: Session = Depends(get
         raise HTTPException(status_code=400, detail="Invalid Google OAuth token")
 
 def authenticate_user(email: str, password: str, db: Session):
-    user = db.query(User).filter(User.email == email).first()
+    user = get_user_by_email(db, email)
     if not user:
         return False
-    if not pwd_context.verify(password, user.hashed_password):
+    # Accounts created with Google have no password
+    if not user.hashed_password:
+        return False
+    # Do not hold a pooled connection while bcrypt runs
+    db.commit()
+    with span("password"):
+        valid, new_hash = get_password_hasher().verify_and_update(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this password was stored
+        db.query(User).filter(User.id == user.id).update({User.hashed_password: new_hash})
+        db.commit()
+        get_user_cache().invalidate(email)
     return user
 
+def _hasher_busy(e: HasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -199,12 +238,16 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _decode_token(token: str) -> dict:
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if payload.get("sub") is None:
+        raise JWTError("Token has no subject")
+    return payload
+
 def verify_token(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=403, detail="Token is invalid or expired")
-        return payload
+        # Repeated requests with the same token skip the signature check until it expires
+        with span("auth"):
+            return get_token_claims_cache().get_or_decode(token, _decode_token)
     except JWTError:
         raise HTTPException(status_code=403, detail="Token is invalid or expired")
@@ -1,51 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.services.ai_service import AIService
-from app.schemas.chat import ChatRequest, ChatResponse, ChatHistory
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Text, cast, delete, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import aclosing
+from typing import Optional, Tuple
+from app.core.metrics import span
+from app.ai_integration.router import ProviderUnavailable
+from app.services.admission import AdmissionRejected
+from app.services.ai_service import AIService, get_ai_service
+from app.services.cancellation import (
+    RequestCancelled, deadline_at, get_cancellation_stats, request_deadline, run_cancellable
+)
+from app.services.idempotency import IdempotencyKeyReused, IdempotencyStore, get_idempotency_store
+from app.schemas.chat import ChatRequest, ChatResponse, ChatHistory, ChatHistoryPage
 from app.models.chat import ChatHistory as ChatHistoryModel
-from app.services.database_connection_service import get_db
+from app.services.database_connection_service import get_async_db
+from app.services.chat_history_writer import (
+    ChatHistoryQueueFull, ChatHistoryWriter, get_chat_history_writer
+)
 from app.api.routes.authentication import verify_token
-from uuid import UUID
-import json
-from datetime import datetime
+from app.services.roadmap_serializer import (
+    chat_history_body, chat_response_body, normalize_stored_text, serialize_data, stored_response
+)
+from app.services.roadmap_tree import find_path, merge_children
+from uuid import UUID, uuid4
+import asyncio
+import base64
+import orjson
+from datetime import datetime, timezone
 
 router = APIRouter()
 
+def _topic_count(roadmap: dict) -> int:
+    return len(roadmap.get("children") or [])
+
+def _history_row(user_id: int, prompt: str, roadmap: dict, data: bytes) -> dict:
+    """A chat_history row; ``data`` is ``roadmap`` already serialized"""
+    return {
+        "id": uuid4(),
+        "user_id": user_id,
+        "prompt": prompt,
+        "response": stored_response(data),
+        "topic_count": _topic_count(roadmap),
+        "created_at": datetime.now(timezone.utc)
+    }
+
+def _cancelled(e: RequestCancelled) -> HTTPException:
+    if e.reason == "deadline":
+        return HTTPException(status_code=504, detail="Request deadline exceeded")
+    # Nobody is listening any more; the status only shows up in access logs
+    return HTTPException(status_code=499, detail="Client closed request")
+
+def _history_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Chat history is busy, please retry",
+        headers={"Retry-After": "1"}
+    )
+
+async def _flush_pending(writer: ChatHistoryWriter) -> None:
+    """Write the queued chat history rows, if any; call it without holding a connection"""
+    if not writer.pending:
+        return
+    try:
+        await writer.flush()
+    except ChatHistoryQueueFull:
+        raise _history_busy()
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    ai_service: AIService = Depends(),
-    db: Session = Depends(get_db),
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    request_timeout: Optional[str] = Header(None, alias="X-Request-Timeout"),
+    ai_service: AIService = Depends(get_ai_service),
+    writer: ChatHistoryWriter = Depends(get_chat_history_writer),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store),
     current_user: dict = Depends(verify_token)
 ):
-    try:
+    deadline = request_deadline(request_timeout)
+    # Absolute, so time spent waiting on a duplicate request still counts
+    expires_at = deadline_at(deadline)
+
+    async def respond() -> bytes:
         # Get the structured response from the service
-        response = await ai_service.generate_response(request.prompt)
+        response = await ai_service.generate_response(request.prompt, deadline=expires_at)
+        # Serialized once, then stored and returned as the same bytes
+        with span("serialize"):
+            data = serialize_data(response['data'])
         
-        # Create a new chat history entry
-        chat_history = ChatHistoryModel(
-            user_id=current_user["user_id"],
-            prompt=request.prompt,
-            response=response,
-            created_at=datetime.utcnow()
-        )
-        
-        # Save to database
+        # Queue the chat history entry; it is inserted with the next batch
         try:
-            db.add(chat_history)
-            db.commit()
-            db.refresh(chat_history)
-        except Exception as db_error:
-            db.rollback()
-            raise HTTPException(
-                status_code=500,
-                detail=f"Database error: {str(db_error)}"
-            )
+            with span("history"):
+                await writer.add(_history_row(current_user["user_id"], request.prompt, response['data'], data))
+        except ChatHistoryQueueFull:
+            raise _history_busy()
+        return chat_response_body(data)
+
+    try:
+        if not idempotency_key:
+            body = await run_cancellable(http_request, respond(), deadline)
+            return Response(content=body, media_type="application/json")
+
+        # Retries with the same key share one generation and one chat history row.
+        # The generation outlives a disconnect (a client that timed out is about
+        # to retry), so it is bounded by the deadline on its own.
+        async def respond_by_deadline() -> bytes:
+            remaining = expires_at - asyncio.get_running_loop().time()
+            return await asyncio.wait_for(respond(), max(0.0, remaining))
+
+        body, replayed = await run_cancellable(
+            http_request,
+            idempotency.run(current_user["user_id"], idempotency_key, request.prompt, respond_by_deadline),
+            deadline
+        )
+        headers = {"Idempotent-Replayed": "true"} if replayed else None
         
         # Return the response
-        return ChatResponse(data=response['data'])
+        return Response(content=body, media_type="application/json", headers=headers)
         
+    except IdempotencyKeyReused as e:
+        raise HTTPException(
+            status_code=422,
+            detail=str(e)
+        )
+    except RequestCancelled as e:
+        raise _cancelled(e)
+    except asyncio.TimeoutError:
+        # A keyed generation reached the deadline it runs under
+        raise _cancelled(RequestCancelled("deadline"))
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=500,
@@ -57,15 +148,85 @@ async def chat(
             detail=f"Unexpected error: {str(e)}"
         )
 
-@router.get("/chat/history", response_model=List[ChatHistory])
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    request_timeout: Optional[str] = Header(None, alias="X-Request-Timeout"),
+    ai_service: AIService = Depends(get_ai_service),
+    writer: ChatHistoryWriter = Depends(get_chat_history_writer),
+    current_user: dict = Depends(verify_token)
+):
+    """Stream roadmap nodes as Server-Sent Events while the LLM generates them"""
+    deadline = request_deadline(request_timeout)
+
+    async def events():
+        try:
+            response = None
+            deadline_scope = asyncio.timeout(deadline)
+            try:
+                async with deadline_scope:
+                    # Closing the stream early aborts the upstream completion
+                    async with aclosing(
+                        ai_service.stream_response(request.prompt, deadline=deadline_at(deadline))
+                    ) as stream:
+                        async for event, data in stream:
+                            if event == "roadmap":
+                                response = data
+                            else:
+                                yield _sse(event, data)
+            except TimeoutError:
+                if not deadline_scope.expired():
+                    raise
+                get_cancellation_stats().record("deadline")
+                yield _sse("error", {"detail": "Request deadline exceeded"})
+                return
+
+            data = serialize_data(response["data"])
+            row = _history_row(current_user["user_id"], request.prompt, response["data"], data)
+            await writer.add(row)
+
+            yield _sse("done", {"id": row["id"], "data": orjson.Fragment(data)})
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client disconnected; nothing is parsed or stored any more
+            get_cancellation_stats().record("disconnect")
+            raise
+        except AdmissionRejected as e:
+            yield _sse("error", {"detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            print(f"Error streaming chat: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _encode_cursor(created_at: datetime, chat_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{chat_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, chat_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(chat_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/chat/history", response_model=ChatHistoryPage)
 async def get_chat_history(
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    writer: ChatHistoryWriter = Depends(get_chat_history_writer),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(verify_token)
 ):
-    """Get all chat history for the current user"""
+    """Get one page of chat summaries for the current user, newest first"""
     try:
-        print(f"Getting chat history for user_id: {current_user.get('user_id')}")
-        
         # Verificar que user_id existe
         if not current_user.get("user_id"):
             raise HTTPException(
@@ -73,28 +234,36 @@ async def get_chat_history(
                 detail="User ID not found in token"
             )
 
-        # Obtener chats
-        chats = db.query(ChatHistoryModel).filter(
+        # The topic count is stored with the row, so the JSON column is never read here
+        topic_count = func.coalesce(ChatHistoryModel.topic_count, 0)
+        query = select(
+            ChatHistoryModel.id,
+            ChatHistoryModel.prompt,
+            ChatHistoryModel.created_at,
+            topic_count.label("topic_count")
+        ).where(
             ChatHistoryModel.user_id == current_user["user_id"]
-        ).order_by(ChatHistoryModel.created_at.desc()).all()
-        
-        # Procesar cada chat
-        processed_chats = []
-        for chat in chats:
-            try:
-                # Asegurarse que response es un dict
-                if isinstance(chat.response, str):
-                    chat.response = json.loads(chat.response)
-                elif not isinstance(chat.response, dict):
-                    chat.response = {}
-                
-                processed_chats.append(chat)
-            except json.JSONDecodeError as e:
-                print(f"Error processing chat {chat.id}: {str(e)}")
-                # Skip invalid chats
-                continue
-        
-        return processed_chats
+        )
+        if cursor:
+            query = query.where(
+                tuple_(ChatHistoryModel.created_at, ChatHistoryModel.id) < _decode_cursor(cursor)
+            )
+        query = query.order_by(
+            ChatHistoryModel.created_at.desc(), ChatHistoryModel.id.desc()
+        ).limit(limit + 1)
+
+        if not cursor:
+            # Chats created moments ago may still be queued in the write-behind buffer
+            await _flush_pending(writer)
+        with span("db"):
+            rows = (await db.execute(query)).all()
+        items = [dict(row._mapping) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = _encode_cursor(last["created_at"], last["id"])
+
+        return {"items": items, "next_cursor": next_cursor}
 
     except HTTPException:
         raise
@@ -108,15 +277,32 @@ async def get_chat_history(
 @router.get("/chat/{chat_id}", response_model=ChatHistory)
 async def get_chat(
     chat_id: UUID,
-    db: Session = Depends(get_db),
+    writer: ChatHistoryWriter = Depends(get_chat_history_writer),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(verify_token)
 ):
     """Get a specific chat by ID"""
     try:
-        chat = db.query(ChatHistoryModel).filter(
+        # The stored JSON text is read as-is and embedded without decoding it
+        query = select(
+            ChatHistoryModel.id,
+            ChatHistoryModel.user_id,
+            ChatHistoryModel.prompt,
+            ChatHistoryModel.created_at,
+            cast(ChatHistoryModel.response, Text)
+        ).where(
             ChatHistoryModel.id == chat_id,
             ChatHistoryModel.user_id == current_user["user_id"]
-        ).first()
+        )
+        with span("db"):
+            chat = (await db.execute(query)).first()
+        if not chat and writer.pending:
+            # A chat created moments ago may still be queued in the write-behind buffer.
+            # Give the connection back first: the writer needs one from the same pool
+            await db.rollback()
+            await _flush_pending(writer)
+            with span("db"):
+                chat = (await db.execute(query)).first()
         
         if not chat:
             raise HTTPException(
@@ -124,11 +310,7 @@ async def get_chat(
                 detail="Chat not found"
             )
         
-        # Verificar que la respuesta sea serializable
-        if not isinstance(chat.response, dict):
-            chat.response = json.loads(chat.response) if isinstance(chat.response, str) else {}
-        
-        return chat
+        return Response(content=chat_history_body(*chat), media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
@@ -137,17 +319,122 @@ async def get_chat(
             detail=f"Error retrieving chat: {str(e)}"
         )
 
+def _stored_chat_query(chat_id: UUID, user_id: int):
+    return select(ChatHistoryModel.prompt, cast(ChatHistoryModel.response, Text)).where(
+        ChatHistoryModel.id == chat_id,
+        ChatHistoryModel.user_id == user_id
+    )
+
+def _stored_roadmap(raw_response: Optional[str]) -> dict:
+    return orjson.loads(normalize_stored_text(raw_response)).get("data") or {}
+
+@router.post("/chat/{chat_id}/nodes/{node_id}/expand", response_model=ChatResponse)
+async def expand_node(
+    chat_id: UUID,
+    node_id: str,
+    http_request: Request,
+    request_timeout: Optional[str] = Header(None, alias="X-Request-Timeout"),
+    ai_service: AIService = Depends(get_ai_service),
+    writer: ChatHistoryWriter = Depends(get_chat_history_writer),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(verify_token)
+):
+    """Generate the children of one node and merge them into the stored roadmap"""
+    try:
+        query = _stored_chat_query(chat_id, current_user["user_id"])
+        chat = (await db.execute(query)).first()
+        if not chat and writer.pending:
+            # A chat created moments ago may still be queued in the write-behind buffer.
+            # Give the connection back first: the writer needs one from the same pool
+            await db.rollback()
+            await _flush_pending(writer)
+            chat = (await db.execute(query)).first()
+        if not chat:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        # Do not hold a connection open while the LLM runs
+        await db.commit()
+
+        prompt, raw_response = chat
+        roadmap = _stored_roadmap(raw_response)
+        if roadmap.get("id") == "error":
+            raise HTTPException(status_code=400, detail="This chat has no learning path to expand")
+        path = find_path(roadmap, node_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Node not found")
+
+        deadline = request_deadline(request_timeout)
+        children = await run_cancellable(
+            http_request,
+            ai_service.expand_node(prompt, path, deadline=deadline_at(deadline)),
+            deadline
+        )
+        if not children:
+            raise HTTPException(
+                status_code=503,
+                detail="No subtopics were generated, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        # Merge into the current tree under a row lock so concurrent expansions are kept
+        chat = (await db.execute(query.with_for_update())).first()
+        path = find_path(_stored_roadmap(chat[1]), node_id) if chat else None
+        if path is None:
+            raise HTTPException(status_code=404, detail="Node not found")
+        roadmap = path[0]
+        node = path[-1]
+        merge_children(node, children)
+        await db.execute(
+            update(ChatHistoryModel)
+            .where(ChatHistoryModel.id == chat_id)
+            .values(response=stored_response(serialize_data(roadmap)), topic_count=_topic_count(roadmap))
+        )
+        await db.commit()
+
+        return Response(content=chat_response_body(serialize_data(node)), media_type="application/json")
+
+    except HTTPException:
+        raise
+    except RequestCancelled as e:
+        raise _cancelled(e)
+    except ProviderUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "60"}
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Unexpected error: {str(e)}"
+        )
+
 @router.delete("/chat/{chat_id}")
 async def delete_chat(
     chat_id: UUID,
-    db: Session = Depends(get_db),
+    writer: ChatHistoryWriter = Depends(get_chat_history_writer),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(verify_token)
 ):
     """Delete a specific chat"""
-    chat = db.query(ChatHistoryModel).filter(
-        ChatHistoryModel.id == chat_id,
-        ChatHistoryModel.user_id == current_user["user_id"]
-    ).first()
+    # A chat created moments ago may still be queued in the write-behind buffer
+    await _flush_pending(writer)
+    chat = await db.scalar(
+        select(ChatHistoryModel).where(
+            ChatHistoryModel.id == chat_id,
+            ChatHistoryModel.user_id == current_user["user_id"]
+        )
+    )
     
     if not chat:
         raise HTTPException(
@@ -155,18 +442,23 @@ async def delete_chat(
             detail="Chat not found"
         )
         
-    db.delete(chat)
-    db.commit()
+    await db.delete(chat)
+    await db.commit()
     return {"message": "Chat deleted successfully"}
 
 @router.delete("/chat/history/all")
 async def delete_all_chats(
-    db: Session = Depends(get_db),
+    writer: ChatHistoryWriter = Depends(get_chat_history_writer),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(verify_token)
 ):
     """Delete all chats for the current user"""
-    db.query(ChatHistoryModel).filter(
-        ChatHistoryModel.user_id == current_user["user_id"]
-    ).delete()
-    db.commit()
+    # Otherwise chats still queued would be inserted after the DELETE and come back
+    await _flush_pending(writer)
+    await db.execute(
+        delete(ChatHistoryModel).where(
+            ChatHistoryModel.user_id == current_user["user_id"]
+        )
+    )
+    await db.commit()
     return {"message": "All chats deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,221 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.core.profiler import get_slow_request_profiler
+from app.core.settings import get_settings
+
+PREFIX = "techbot"
+
+# Seconds; covers everything from a cache hit to a slow LLM completion
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_NAME_UNSAFE = re.compile(r'[^a-zA-Z0-9_]')
+
+# stats() keys that only ever go up; they are exported as counters so rate() works.
+# "cancellations" and "degraded" are dicts of counts per reason.
+COUNTERS = frozenset({
+    "admitted", "attached", "batches", "breaker_open", "cancellations", "coalesced", "completed",
+    "conflicts", "count", "degraded", "dropped", "errors", "executed", "fetch_errors", "fetches",
+    "hedges", "hits", "lookups", "matches", "misses", "rehashed", "rejected", "replayed",
+    "restarts", "retries", "short_circuited", "started", "timed_out", "too_late", "trips",
+    "verified", "wins", "written"
+})
+
+# Stage -> seconds spent in it during the current request, for Server-Timing
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, in the Prometheus sense"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # Label values -> [count per bucket (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        # Spans also finish in threadpool threads (sync dependencies)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(values, list(counts), total) for values, (counts, total) in self._series.items()]
+        bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+        for values, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, bound)} {cumulative}")
+            labels = _labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def _join(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+def _flatten(
+    name: List[str],
+    value: Any,
+    labelled: Dict[str, str],
+    path: str = "",
+    labels: Tuple[Tuple[str, str], ...] = ()
+) -> Iterator[Tuple[str, Tuple[Tuple[str, str], ...], float, bool]]:
+    """(name, labels, value, is_counter) for every number, flag and state in a stats() dict
+
+    ``labelled`` maps the dotted path of a dict keyed by values rather than
+    names (provider names, languages) to the label its keys are exported as;
+    ``*`` stands for such a key further down the path.
+    """
+    if isinstance(value, dict):
+        label = labelled.get(path)
+        for key, item in value.items():
+            if label is None:
+                yield from _flatten(name + [str(key)], item, labelled, _join(path, str(key)), labels)
+            else:
+                yield from _flatten(name, item, labelled, _join(path, "*"), labels + ((label, str(key)),))
+        return
+    metric = _NAME_UNSAFE.sub("_", "_".join(name))
+    if isinstance(value, bool):
+        yield metric, labels, float(value), False
+    elif isinstance(value, (int, float)):
+        counter = name[-1] in COUNTERS
+        yield (metric + "_total" if counter else metric), labels, float(value), counter
+    elif isinstance(value, str):
+        # States such as the breaker's "open" become a labelled 1
+        yield metric, labels + (("value", value),), 1.0, False
+
+class MetricsRegistry:
+    """Per-worker metrics: stage and request histograms plus stats read at scrape time
+
+    Gauges and counters come from the ``stats()`` dicts the services
+    already expose for the /health endpoints, so there is a single source
+    for each number. Keys in COUNTERS become ``_total`` counters.
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            f"{PREFIX}_stage_seconds", "Time spent in each stage of a request", ("stage",)
+        )
+        self.request_seconds = Histogram(
+            f"{PREFIX}_http_request_seconds", "HTTP request latency", ("method", "route", "status")
+        )
+        self._stats: Dict[str, Tuple[Callable[[], Dict], Dict[str, str]]] = {}
+
+    def register_stats(self, prefix: str, collect: Callable[[], Dict], labelled: Optional[Dict[str, str]] = None) -> None:
+        """Export ``collect()`` as ``techbot_<prefix>_*``; see ``_flatten`` for ``labelled``"""
+        self._stats[prefix] = (collect, labelled or {})
+
+    def render(self) -> str:
+        lines = self.stage_seconds.render() + self.request_seconds.render()
+        for prefix, (collect, labelled) in self._stats.items():
+            try:
+                stats = collect()
+            except Exception as e:
+                print(f"Error collecting {prefix} metrics: {str(e)}")
+                continue
+            # Series of one metric must be listed together, whatever order the dicts use
+            families: Dict[str, Tuple[str, List[str]]] = {}
+            for name, labels, value, counter in _flatten([PREFIX, prefix], stats, labelled):
+                kind, series = families.setdefault(name, ("counter" if counter else "gauge", []))
+                series.append(f"{name}{_labels(*zip(*labels)) if labels else ''} {value}")
+            for name, (kind, series) in families.items():
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(series)
+        return "\n".join(lines) + "\n"
+
+@lru_cache()
+def get_metrics() -> MetricsRegistry:
+    return MetricsRegistry()
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a stage into the stage histogram and the current request's Server-Timing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        get_metrics().stage_seconds.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            # Hedged attempts or several parses in one request add up
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+def server_timing(timings: Dict[str, float], total: float) -> bytes:
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries).encode()
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware timing every HTTP request
+
+    Adds a ``Server-Timing`` header with the stages recorded by ``span``
+    before the response started (streamed responses only list what ran
+    before the first chunk), records the request histogram by route
+    template, and hands slow requests to the sampling profiler when it
+    is enabled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header_enabled = get_settings().METRICS_SERVER_TIMING
+        self.metrics = get_metrics()
+        self.profiler = get_slow_request_profiler()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        profiling = self.profiler.request_started() if self.profiler.enabled else None
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.header_enabled:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(timings, time.perf_counter() - started)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            elapsed = time.perf_counter() - started
+            # FastAPI stores the matched route in the scope; templates keep the label set small
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            self.metrics.request_seconds.observe(elapsed, scope["method"], path, str(status))
+            if profiling is not None:
+                self.profiler.request_finished(profiling, scope["method"], path, elapsed)
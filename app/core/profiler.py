@@ -0,0 +1,85 @@
+import sys
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Callable, Deque, Optional, Tuple
+from app.core.settings import get_settings
+
+# Innermost frames kept per sampled stack
+MAX_STACK_DEPTH = 12
+# Stacks listed per slow request by the default hook
+TOP_STACKS = 5
+
+def _fold(frame) -> str:
+    """'module:function;...' from the outermost to the innermost kept frame"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def print_slow_request(method: str, path: str, elapsed: float, stacks: Counter) -> None:
+    total = sum(stacks.values())
+    print(f"Slow request {method} {path} took {elapsed:.2f}s ({total} event loop samples)")
+    for stack, count in stacks.most_common(TOP_STACKS):
+        print(f"  {count / total:6.1%}  {stack}")
+
+class SlowRequestProfiler:
+    """Opt-in sampling profiler for requests slower than ``threshold`` seconds
+
+    While requests are in flight, a daemon thread records the event loop
+    thread's stack every ``interval`` seconds into a ring buffer. When a
+    request finishes over the threshold, the stacks sampled during it are
+    passed to ``hook``. The loop is shared by concurrent requests, so the
+    report shows what kept the worker busy (or idle in the selector,
+    waiting on I/O) while the request was slow.
+    """
+
+    def __init__(self, threshold: float, interval: float, window: float = 120.0):
+        self.threshold = threshold
+        self.interval = interval
+        self.enabled = threshold > 0
+        self.hook: Callable[[str, str, float, Counter], None] = print_slow_request
+        self._samples: Deque[Tuple[float, str]] = deque(maxlen=max(1, int(window / interval)))
+        self._loop_thread: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._active = 0
+        self.reported = 0
+
+    def _sample(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._samples.append((time.monotonic(), _fold(frame)))
+
+    def request_started(self) -> float:
+        """Call from the event loop thread; returns the token for ``request_finished``"""
+        if self._thread is None:
+            self._loop_thread = threading.get_ident()
+            self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+            self._thread.start()
+        self._active += 1
+        return time.monotonic()
+
+    def request_finished(self, started: float, method: str, path: str, elapsed: float) -> None:
+        self._active -= 1
+        if elapsed < self.threshold:
+            return
+        stacks = Counter(stack for sampled_at, stack in list(self._samples) if sampled_at >= started)
+        if not stacks:
+            return
+        self.reported += 1
+        try:
+            self.hook(method, path, elapsed, stacks)
+        except Exception as e:
+            print(f"Error reporting slow request: {str(e)}")
+
+@lru_cache()
+def get_slow_request_profiler() -> SlowRequestProfiler:
+    settings = get_settings()
+    return SlowRequestProfiler(settings.PROFILE_SLOW_REQUESTS, settings.PROFILE_INTERVAL)
@@ -8,13 +8,68 @@ ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str
+    OPENAI_MODEL: str = "gpt-3.5-turbo-16k"
+    OPENAI_FALLBACK_MODEL: str = "gpt-4o-mini"
     AI_PROVIDER: str = "langchain"
+    AI_FALLBACK_PROVIDERS: str = ""
+    AI_ROUTING_MODE: str = "fallback"
+    AI_PROVIDER_TIMEOUT: float = 45.0
+    AI_HEDGE_DELAY: float = 8.0
+    AI_HEDGE_MIN_DELAY: float = 1.0
+    AI_HEDGE_QUANTILE: float = 0.95
+    AI_RESPONSE_FORMAT: str = "text"
+    AI_REQUEST_TIMEOUT: float = 60.0
+    CHAT_REQUEST_DEADLINE: float = 120.0
+    AI_HTTP_MAX_CONNECTIONS: int = 100
+    AI_HTTP_MAX_KEEPALIVE: int = 20
+    AI_MAX_CONCURRENCY_TOTAL: int = 32
+    AI_MAX_CONCURRENCY: int = 0
+    AI_MAX_QUEUE: int = 64
+    AI_QUEUE_TIMEOUT: float = 15.0
+    AI_DEGRADE_PROVIDER: str = "template"
+    AI_BREAKER_THRESHOLD: int = 5
+    AI_BREAKER_COOLDOWN: float = 30.0
+    ROADMAP_CACHE_SIZE: int = 1024
+    ROADMAP_CACHE_TTL: int = 6 * 60 * 60
+    ROADMAP_CATALOG_PATH: str = "data/roadmap_catalog.json"
+    ROADMAP_CATALOG_SIZE: int = 200
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_INDEX_CAPACITY: int = 2048
+    SEMANTIC_INDEX_DIM: int = 512
+    SEMANTIC_MATCH_THRESHOLD: float = 0.88
     DATABASE_USER: str
     DATABASE_USER_PASSWORD: str
     DATABASE_HOST: str
     DATABASE_PORT: str
     DATABASE_NAME: str
+    DATABASE_POOL_MODE: str = "auto"
+    DATABASE_MAX_CONNECTIONS: int = 20
+    DATABASE_POOL_SIZE: int = 0
+    DATABASE_SYNC_POOL_SIZE: int = 2
+    DATABASE_MAX_OVERFLOW: int = 0
+    DATABASE_POOL_TIMEOUT: int = 10
+    DATABASE_POOL_RECYCLE: int = 1800
+    CHAT_HISTORY_QUEUE_SIZE: int = 1000
+    CHAT_HISTORY_BATCH_SIZE: int = 50
+    CHAT_HISTORY_FLUSH_INTERVAL: float = 0.2
+    CHAT_HISTORY_ENQUEUE_TIMEOUT: float = 2.0
+    CHAT_HISTORY_RETRY_TIMEOUT: float = 300.0
+    CHAT_HISTORY_MAX_RETRY_DELAY: float = 30.0
+    IDEMPOTENCY_TTL: int = 24 * 60 * 60
+    IDEMPOTENCY_MAX_KEYS: int = 10000
+    METRICS_SERVER_TIMING: bool = True
+    PROFILE_SLOW_REQUESTS: float = 0.0
+    PROFILE_INTERVAL: float = 0.005
     GOOGLE_CLIENT_ID: str
+    GOOGLE_CERTS_URL: str = "https://www.googleapis.com/oauth2/v1/certs"
+    GOOGLE_CERTS_DEFAULT_TTL: int = 60 * 60
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE: int = 32
+    PASSWORD_HASH_TIMEOUT: float = 10.0
+    TOKEN_CACHE_SIZE: int = 10000
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 60
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key")
     ALLOWED_ORIGINS: str = os.getenv("ALLOWED_ORIGINS", "*")
     
@@ -1,9 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import chat, authentication
+from app.ai_integration.factory import AIProviderFactory
+from app.core.metrics import ServerTimingMiddleware, get_metrics
 from app.core.settings import get_settings
+from app.services.ai_service import get_ai_service
+from app.services.cancellation import get_cancellation_stats
+from app.services.chat_history_writer import get_chat_history_writer
+from app.services.idempotency import get_idempotency_store
+from app.services.database_connection_service import async_engine, get_pool_stats
+from app.services.google_auth import get_google_token_verifier
+from app.services.password_hasher import get_password_hasher
+from app.services.principal_cache import get_token_claims_cache, get_user_cache
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Providers and their HTTP pools live for the whole worker lifetime
+    await AIProviderFactory.startup()
+    get_ai_service().load_catalog()
+    await get_chat_history_writer().start()
+    await get_google_token_verifier().start()
+    get_password_hasher().start()
+    yield
+    await get_google_token_verifier().stop()
+    get_password_hasher().shutdown()
+    # Queued chat history is flushed before the engine goes away
+    await get_chat_history_writer().stop()
+    await AIProviderFactory.shutdown()
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 settings = get_settings()
 
 # Configurar CORS
@@ -22,6 +49,8 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
+# Outermost, so the timings include every other middleware
+app.add_middleware(ServerTimingMiddleware)
 
 # Include routers
 app.include_router(authentication.router, prefix="/api")
@@ -29,4 +58,48 @@ app.include_router(chat.router, prefix="/api")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/database")
+async def database_health():
+    return {"pool": get_pool_stats()}
+
+def ai_stats():
+    return {
+        **get_ai_service().stats(),
+        "idempotency": get_idempotency_store().stats(),
+        "cancellations": get_cancellation_stats().stats()
+    }
+
+def auth_stats():
+    return {
+        "google": get_google_token_verifier().stats(),
+        "password_hasher": get_password_hasher().stats(),
+        "token_cache": get_token_claims_cache().stats(),
+        "user_cache": get_user_cache().stats()
+    }
+
+@app.get("/health/ai")
+async def ai_health():
+    return ai_stats()
+
+@app.get("/health/auth")
+async def auth_health():
+    return auth_stats()
+
+# /metrics reports the same numbers as the health endpoints; dicts keyed by
+# provider, language, reason or engine are exported with that key as a label
+metrics = get_metrics()
+metrics.register_stats("ai", ai_stats, {
+    "semantic_index": "language",
+    "providers.providers": "provider",
+    "degraded": "reason",
+    "cancellations": "reason"
+})
+metrics.register_stats("auth", auth_stats)
+metrics.register_stats("database_pool", get_pool_stats, {"": "engine"})
+metrics.register_stats("chat_history", lambda: get_chat_history_writer().stats())
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -11,8 +11,11 @@ class ChatHistory(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     prompt = Column(String, nullable=False)
     response = Column(JSON, nullable=False)
+    # Main topics in the roadmap, so the history listing never reads the JSON
+    topic_count = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-# Create the table
-from app.services.database_connection_service import engine
-ChatHistory.metadata.create_all(bind=engine) 
+    __table_args__ = (
+        # Backs the keyset-paginated history listing
+        Index("ix_chat_history_user_created", user_id, created_at.desc(), id.desc()),
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import text
+from app.models.chat import ChatHistory
+from app.schemas.user import User
+from app.services.database_connection_service import Base, engine
+
+# Columns added to tables that already existed; create_all never alters a table
+UPGRADES = (
+    "ALTER TABLE chat_history ADD COLUMN IF NOT EXISTS topic_count INTEGER",
+    "UPDATE chat_history SET topic_count = coalesce(json_array_length(response->'data'->'children'), 0) "
+    "WHERE topic_count IS NULL",
+)
+
+def create_schema(bind=engine) -> None:
+    """Create missing tables, columns and indexes; safe to run on every deploy"""
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as connection:
+        for statement in UPGRADES:
+            connection.execute(text(statement))
+    # create_all skips indexes of tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
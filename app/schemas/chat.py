@@ -17,6 +17,27 @@ class DiagramNode(BaseModel):
 
 DiagramNode.model_rebuild()
 
+# Tool-call schema for AI_RESPONSE_FORMAT=json. It is flat on purpose:
+# function schemas can't express the recursive DiagramNode, and ids are
+# derived from titles afterwards, so the model never spends tokens on them.
+
+class GeneratedSubtopic(BaseModel):
+    """A subtopic one level below a main topic"""
+    title: str
+    description: str
+    resources: List[Resource]
+
+class GeneratedTopic(BaseModel):
+    """A main topic of the learning path"""
+    title: str
+    description: str
+    resources: List[Resource]
+    subtopics: List[GeneratedSubtopic] = []
+
+class GeneratedRoadmap(BaseModel):
+    """Learning path for a technology career, as a list of main topics"""
+    topics: List[GeneratedTopic]
+
 class ChatRequest(BaseModel):
     prompt: str
 
@@ -32,4 +53,14 @@ class ChatHistory(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class ChatSummary(BaseModel):
+    id: UUID
+    prompt: str
+    created_at: datetime
+    topic_count: int
+
+class ChatHistoryPage(BaseModel):
+    items: List[ChatSummary]
+    next_cursor: Optional[str] = None
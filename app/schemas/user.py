@@ -1,7 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.sql import func
 from app.services.database_connection_service import Base
-from app.services.database_connection_service import engine
 
 class User(Base):
     __tablename__ = "users"
@@ -11,5 +10,3 @@ class User(Base):
     hashed_password = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-
-User.metadata.create_all(bind=engine)
\ No newline at end of file
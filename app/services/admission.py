@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from app.core.metrics import span
+
+class AdmissionRejected(Exception):
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class _Waiter:
+    def __init__(self, deadline: float, order: int, enqueued_at: float, future: asyncio.Future):
+        self.deadline = deadline
+        self.order = order
+        self.enqueued_at = enqueued_at
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.deadline, self.order) < (other.deadline, other.order)
+
+class AdmissionController:
+    """Concurrency limit with a bounded, earliest-deadline-first wait queue
+
+    At most ``max_concurrency`` callers hold a slot at once. Up to
+    ``max_queue`` more wait for one, and a freed slot goes to the waiter
+    whose deadline is closest. Deadlines are absolute event loop times.
+    Callers are rejected with AdmissionRejected straight away when the
+    queue is full or their deadline is closer than the expected wait, and
+    once their deadline (or ``queue_timeout``) passes while waiting.
+    ``retry_after`` estimates when a slot should be free.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._order = itertools.count()
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self._hold_time = 5.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.too_late = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._hold_time * backlog / self.max_concurrency))
+
+    def expected_wait(self, deadline: float) -> float:
+        """Seconds until a caller with ``deadline`` should get a slot, given who is ahead of it"""
+        ahead = sum(1 for waiter in self._waiters if waiter.deadline <= deadline)
+        return self._hold_time * (ahead + 1) / self.max_concurrency
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self._admit(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.retry_after(), "Too many roadmap generations in progress")
+
+        # Nobody waits longer than queue_timeout, however far away their deadline is
+        give_up = now + self.queue_timeout
+        if deadline is None:
+            deadline = give_up
+        elif deadline - now < self.expected_wait(deadline):
+            # The request would run out of time in the queue anyway
+            self.too_late += 1
+            raise AdmissionRejected(self.retry_after(), "Not enough time left to wait for a generation slot")
+        waiter = _Waiter(deadline, next(self._order), now, loop.create_future())
+        heapq.heappush(self._waiters, waiter)
+        try:
+            await asyncio.wait_for(waiter.future, timeout=max(0.0, min(deadline, give_up) - now))
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over just as we gave up on it
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise AdmissionRejected(self.retry_after(), "Timed out waiting for a generation slot")
+            raise
+        self._admit(loop.time() - now)
+
+    def release(self) -> None:
+        # Hand the slot straight to the most urgent waiter, if any
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        with span("queue"):
+            await self.acquire(deadline)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            yield
+        finally:
+            self._hold_time = 0.8 * self._hold_time + 0.2 * (loop.time() - started)
+            self.release()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "too_late": self.too_late,
+            "wait_time_avg": self.wait_time_total / self.admitted if self.admitted else 0.0,
+            "wait_time_max": self.wait_time_max
+        }
+
+def per_worker_limit(total: int) -> int:
+    """Split a deployment-wide limit across gunicorn workers"""
+    workers = max(1, int(os.getenv("GUNICORN_WORKERS", "4")))
+    return max(1, total // workers)
@@ -1,109 +1,119 @@
-from typing import Dict, List
-import re
+from contextlib import aclosing
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+import orjson
+from pydantic import ValidationError
+from app.ai_integration.base import AIProvider
 from app.ai_integration.factory import AIProviderFactory
+from app.ai_integration.router import ProviderRouter
+from app.ai_integration.validation import validate_prompt
+from app.core.metrics import span
 from app.core.settings import get_settings
+from app.schemas.chat import GeneratedRoadmap, GeneratedSubtopic, GeneratedTopic
+from app.services.admission import AdmissionController, AdmissionRejected, per_worker_limit
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.roadmap_cache import RoadmapCache
+from app.services.roadmap_catalog import RoadmapCatalog
+from app.services.roadmap_parser import RoadmapParser, create_id, parse_resource, parse_topics
+from app.services.semantic_index import SemanticIndex
+from app.services.single_flight import SingleFlight
+
+async def _prepend(first, rest: AsyncIterator) -> AsyncIterator:
+    """``first``, then the rest of ``rest``; closing it closes ``rest``"""
+    async with aclosing(rest):
+        yield first
+        async for item in rest:
+            yield item
 
 class AIService:
     def __init__(self):
         settings = get_settings()
-        self.ai_provider = AIProviderFactory.get_provider("langchain")
+        self.settings = settings
+        self.router = ProviderRouter(
+            AIProviderFactory.configured_providers(),
+            mode=settings.AI_ROUTING_MODE,
+            timeout=settings.AI_PROVIDER_TIMEOUT,
+            hedge_delay=settings.AI_HEDGE_DELAY,
+            hedge_min_delay=settings.AI_HEDGE_MIN_DELAY,
+            hedge_quantile=settings.AI_HEDGE_QUANTILE
+        )
+        self.catalog = RoadmapCatalog()
+        self.cache = RoadmapCache(settings.ROADMAP_CACHE_SIZE, settings.ROADMAP_CACHE_TTL)
+        self.in_flight = SingleFlight()
+        # One near-duplicate index per language, so matches never cross languages
+        self.semantic_indexes: Dict[str, SemanticIndex] = {}
+        self.admission = AdmissionController(
+            max_concurrency=settings.AI_MAX_CONCURRENCY or per_worker_limit(settings.AI_MAX_CONCURRENCY_TOTAL),
+            max_queue=settings.AI_MAX_QUEUE,
+            queue_timeout=settings.AI_QUEUE_TIMEOUT
+        )
+        # Local provider answering when the LLM is overloaded or failing
+        self.degrade_provider = (
+            AIProviderFactory.get_provider(settings.AI_DEGRADE_PROVIDER)
+            if settings.AI_DEGRADE_PROVIDER else None
+        )
+        self.breaker = CircuitBreaker(settings.AI_BREAKER_THRESHOLD, settings.AI_BREAKER_COOLDOWN)
+        self.degraded: Dict[str, int] = {"overload": 0, "breaker_open": 0, "failure": 0}
 
     def _parse_topics(self, content: str) -> List[Dict]:
-        topics = []
-        current_topic = None
-        current_subtopic = None
-        
-        lines = content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Main topic (starts with number)
-            if re.match(r'^\d+\.', line):
-                if current_topic:
-                    topics.append(current_topic)
-                topic_name = re.sub(r'^.*?:\s*', '', line.split('.', 1)[1].strip())
-                current_topic = {
-                    "id": self._create_id(topic_name),
-                    "title": topic_name,
-                    "description": "",
-                    "resources": [],
-                    "children": []
-                }
-                current_subtopic = None
-
-            # Subtopic
-            elif re.match(r'^[a-z]\)', line):
-                if current_topic:
-                    subtopic_name = re.sub(r'^.*?:\s*', '', re.sub(r'^[a-z]\)\s*', '', line))
-                    current_subtopic = {
-                        "id": self._create_id(subtopic_name),
-                        "title": subtopic_name,
-                        "description": "",
-                        "resources": []
-                    }
-                    current_topic["children"].append(current_subtopic)
-
-            # Resource line
-            elif 'Resource:' in line or 'http' in line.lower():
-                resource = self._parse_resource(line)
-                if current_subtopic:
-                    current_subtopic["resources"].append(resource)
-                elif current_topic:
-                    current_topic["resources"].append(resource)
-
-            # Description line
-            elif line.startswith('-'):
-                description = line.lstrip('- ').strip()
-                description = re.sub(r'^Description:\s*', '', description)
-                if current_subtopic:
-                    current_subtopic["description"] = description
-                elif current_topic:
-                    current_topic["description"] = description
-
-        if current_topic:
-            topics.append(current_topic)
-
-        return topics
+        return parse_topics(content)
 
     def _parse_resource(self, line: str) -> Dict:
-        resource_type = "article"
-        if "video" in line.lower() or "youtube" in line.lower():
-            resource_type = "video"
-        elif "course" in line.lower() or "tutorial" in line.lower():
-            resource_type = "course"
-
-        url_match = re.search(r'https?://[^\s]+', line)
-        url = url_match.group(0) if url_match else "https://roadmap.sh"
-
-        title_match = re.search(r'\[(.*?)\]', line)
-        if title_match:
-            title = title_match.group(1)
-        else:
-            title = line.split('Resource:', 1)[-1].split('http')[0].strip()
-            if not title:
-                title = "Learning Resource"
+        return parse_resource(line)
 
-        return {
-            "title": title,
-            "url": url,
-            "type": resource_type
+    def _create_id(self, title: str) -> str:
+        return create_id(title)
+
+    def _node_from_model(self, node: Union[GeneratedTopic, GeneratedSubtopic]) -> Dict:
+        # Ids are derived from titles exactly like the text parser does
+        result = {
+            "id": self._create_id(node.title),
+            "title": node.title,
+            "description": node.description,
+            "resources": [resource.model_dump() for resource in node.resources]
         }
+        if isinstance(node, GeneratedTopic):
+            result["children"] = [self._node_from_model(child) for child in node.subtopics]
+        return result
 
-    def _create_id(self, title: str) -> str:
-        return re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
+    def _salvage_structured(self, payload) -> List[Dict]:
+        """Keep the valid topics and subtopics of a tool call that failed validation as a whole"""
+        topics = []
+        raw_topics = payload.get("topics") if isinstance(payload, dict) else None
+        for raw in raw_topics if isinstance(raw_topics, list) else []:
+            if not isinstance(raw, dict):
+                continue
+            subtopics = []
+            for raw_subtopic in raw.get("subtopics") or []:
+                try:
+                    subtopics.append(GeneratedSubtopic.model_validate(raw_subtopic))
+                except ValidationError:
+                    continue
+            try:
+                topic = GeneratedTopic.model_validate({**raw, "subtopics": subtopics})
+            except ValidationError:
+                continue
+            topics.append(self._node_from_model(topic))
+        return topics
 
-    async def generate_response(self, prompt: str) -> Dict:
-        raw_response = await self.ai_provider.generate_response(prompt)
-        
-        # If the response is already a dictionary (error message), return it directly
-        if isinstance(raw_response, dict):
-            return raw_response
-            
-        # Otherwise, parse the content and create the learning path
-        topics = self._parse_topics(raw_response)
-        
+    def _parse_structured(self, content: str) -> List[Dict]:
+        """Validate a structured response in one pass
+
+        Plain text (the model skipped the tool call) goes to the text
+        parser; JSON that fails validation keeps whatever is valid in it.
+        """
+        try:
+            with span("validate"):
+                roadmap = GeneratedRoadmap.model_validate_json(content)
+        except ValidationError:
+            try:
+                payload = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                return self._parse_topics(content)
+            return self._salvage_structured(payload)
+        return [self._node_from_model(topic) for topic in roadmap.topics]
+
+    def _build_roadmap(self, prompt: str, topics: List[Dict]) -> Dict:
         return {
             "data": {
                 "id": "root",
@@ -118,4 +128,316 @@ class AIService:
                 ],
                 "children": topics
             }
-        } 
\ No newline at end of file
+        }
+
+    def _semantic_index(self, cache_key: str) -> SemanticIndex:
+        language = cache_key.split(":", 1)[0]
+        index = self.semantic_indexes.get(language)
+        if index is None:
+            index = SemanticIndex(
+                self.settings.SEMANTIC_INDEX_CAPACITY,
+                dim=self.settings.SEMANTIC_INDEX_DIM,
+                threshold=self.settings.SEMANTIC_MATCH_THRESHOLD
+            )
+            self.semantic_indexes[language] = index
+        return index
+
+    def _find_similar(self, prompt: str, cache_key: str) -> Optional[List[Dict]]:
+        if not self.settings.SEMANTIC_CACHE_ENABLED:
+            return None
+        for key, score in self._semantic_index(cache_key).search(prompt):
+            # Index rows can outlive their cache entry, so skip expired ones
+            topics = self.cache.peek(key)
+            if topics is None:
+                topics = self.catalog.peek(key)
+            if topics is not None:
+                return topics
+        return None
+
+    def _lookup(self, prompt: str, cache_key: str) -> Optional[List[Dict]]:
+        """Catalog, then cache, then near-duplicates; None means the LLM is needed"""
+        topics = self.catalog.get(cache_key)
+        if topics is None:
+            topics = self.cache.get(cache_key)
+        if topics is None:
+            topics = self._find_similar(prompt, cache_key)
+        return topics
+
+    def load_catalog(self) -> None:
+        """Load the pre-generated catalog and index its prompts for near-duplicate lookups"""
+        path = self.settings.ROADMAP_CATALOG_PATH
+        if not path or not self.catalog.load(path):
+            return
+        if self.settings.SEMANTIC_CACHE_ENABLED:
+            for key, prompt in self.catalog.prompts():
+                self._semantic_index(key).add(key, prompt)
+
+    def _remember(self, prompt: str, cache_key: str, topics: List[Dict]) -> None:
+        self.cache.set(cache_key, topics)
+        if self.settings.SEMANTIC_CACHE_ENABLED:
+            self._semantic_index(cache_key).add(cache_key, prompt)
+
+    def _is_valid(self, result) -> bool:
+        # Error messages are final answers; parsed roadmaps need at least one topic
+        return isinstance(result, dict) or bool(result)
+
+    def _can_degrade(self) -> bool:
+        return self.degrade_provider is not None
+
+    async def _degraded_topics(self, prompt: str, reason: str):
+        """Template topics served instead of an error; never cached"""
+        self.degraded[reason] += 1
+        print(f"Serving template roadmap ({reason}) for: {prompt}")
+        with span("degrade"):
+            raw_response = await self.degrade_provider.generate_response(prompt, response_format="json")
+        if isinstance(raw_response, dict):
+            return raw_response
+        return self._parse_structured(raw_response)
+
+    async def generate_topics(self, prompt: str):
+        """Run the providers once for ``prompt``, bypassing cache, admission and degrade mode"""
+        response_format = self.settings.AI_RESPONSE_FORMAT
+
+        async def attempt(provider: AIProvider):
+            with span("llm"):
+                raw_response = await provider.generate_response(
+                    prompt, response_format=response_format
+                )
+            
+            # If the response is already a dictionary (error message), return it directly
+            if isinstance(raw_response, dict):
+                return raw_response
+                
+            # Otherwise, parse the content and create the learning path
+            with span("parse"):
+                if response_format == "json":
+                    return self._parse_structured(raw_response)
+                return self._parse_topics(raw_response)
+
+        return await self.router.run(attempt, self._is_valid)
+
+    async def _generate_topics(self, prompt: str, cache_key: str, deadline: Optional[float] = None):
+        if self._can_degrade() and not self.breaker.allow():
+            return await self._degraded_topics(prompt, "breaker_open")
+        try:
+            async with self.admission.slot(deadline):
+                topics = await self.generate_topics(prompt)
+        except AdmissionRejected:
+            if not self._can_degrade():
+                raise
+            return await self._degraded_topics(prompt, "overload")
+        except Exception:
+            self.breaker.record_failure()
+            if not self._can_degrade():
+                raise
+            return await self._degraded_topics(prompt, "failure")
+
+        if not topics:
+            # An empty tree is as useless to the user as an error
+            self.breaker.record_failure()
+            if self._can_degrade():
+                return await self._degraded_topics(prompt, "failure")
+            return []
+        self.breaker.record_success()
+        if not isinstance(topics, dict):
+            self._remember(prompt, cache_key, topics)
+        return topics
+
+    async def _generate_children(
+        self,
+        prompt: str,
+        titles: List[str],
+        existing: List[str],
+        leaves: bool,
+        key: str,
+        deadline: Optional[float] = None
+    ) -> List[Dict]:
+        response_format = self.settings.AI_RESPONSE_FORMAT
+
+        async def attempt(provider: AIProvider):
+            with span("llm"):
+                raw_response = await provider.expand_node(
+                    prompt, titles, existing, response_format=response_format
+                )
+            with span("parse"):
+                if response_format == "json":
+                    nodes = self._parse_structured(raw_response)
+                else:
+                    nodes = self._parse_topics(raw_response)
+            if leaves:
+                # Below the main topics nodes only carry children once expanded
+                nodes = [{key: value for key, value in node.items() if key != "children"} for node in nodes]
+            return nodes
+
+        async with self.admission.slot(deadline):
+            # Providers without expand_node (e.g. templates) are skipped instead of counted as failures
+            children = await self.router.run(attempt, bool, lambda provider_class: provider_class.can_expand())
+        if children:
+            self.cache.set(key, children)
+        return children or []
+
+    async def expand_node(self, prompt: str, path: List[Dict], deadline: Optional[float] = None) -> List[Dict]:
+        """Generate children for the last node of ``path``, which starts at the roadmap's root
+
+        Expansions are cached and coalesced per prompt, node and the node's
+        current children, so expanding a node again asks for new subtopics
+        instead of returning the ones it already has. ``deadline`` is the
+        request's absolute event loop deadline, used to order the admission queue.
+        """
+        topics = path[1:]
+        current = path[-1].get("children") or []
+        titles = [item["title"] for item in topics]
+        existing = [child["title"] for child in current]
+        key = (
+            self.cache.make_key(prompt)
+            + "#" + "/".join(item["id"] for item in topics)
+            + "|" + ",".join(sorted(child["id"] for child in current))
+        )
+
+        children = self.cache.get(key)
+        if children is None:
+            children = await self.in_flight.do(
+                key, lambda: self._generate_children(prompt, titles, existing, bool(topics), key, deadline)
+            )
+        return children
+
+    async def generate_response(self, prompt: str, deadline: Optional[float] = None) -> Dict:
+        # Topics are cached without the root so each user keeps their own title
+        with span("classify"):
+            cache_key = self.cache.make_key(prompt)
+        with span("lookup"):
+            topics = self._lookup(prompt, cache_key)
+        if topics is None:
+            # Prompts that are not about a tech career never need an admission slot
+            error = validate_prompt(prompt)
+            if error:
+                return error
+            # Identical prompts already being generated share that generation
+            topics = await self.in_flight.do(
+                cache_key, lambda: self._generate_topics(prompt, cache_key, deadline)
+            )
+            if isinstance(topics, dict):
+                return topics
+        
+        return self._build_roadmap(prompt, topics)
+
+    def _node_events(self, topics: List[Dict]) -> List[Tuple[str, Dict]]:
+        """Flatten a finished tree into the (parent_id, node) pairs RoadmapParser emits"""
+        events = []
+        for topic in topics:
+            events.append(("root", {key: value for key, value in topic.items() if key != "children"}))
+            for child in topic.get("children") or []:
+                events.append((topic["id"], child))
+        return events
+
+    async def _open_stream(self, prompt: str) -> Optional[AsyncIterator]:
+        """A provider's response stream, opened through the router
+
+        Fallback and hedging apply until a provider sends its first chunk;
+        after that the stream is committed to that provider. Returns None
+        when every provider's stream ended without a chunk.
+        """
+        async def attempt(provider: AIProvider):
+            chunks = provider.stream_response(prompt)
+            try:
+                with span("llm"):
+                    first = await chunks.__anext__()
+            except StopAsyncIteration:
+                return None
+            except BaseException:
+                # Hedged attempts that lost are cancelled here
+                await chunks.aclose()
+                raise
+            return _prepend(first, chunks)
+
+        return await self.router.run(attempt, lambda chunks: chunks is not None, observe=False)
+
+    async def stream_response(
+        self, prompt: str, deadline: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield ("node", event) pairs as nodes finish, then ("roadmap", full response)"""
+        with span("classify"):
+            cache_key = self.cache.make_key(prompt)
+        with span("lookup"):
+            topics = self._lookup(prompt, cache_key)
+        if topics is not None:
+            for parent_id, node in self._node_events(topics):
+                yield "node", {"parent_id": parent_id, "node": node}
+            yield "roadmap", self._build_roadmap(prompt, topics)
+            return
+        # Prompts that are not about a tech career never need an admission slot
+        error = validate_prompt(prompt)
+        if error:
+            yield "roadmap", error
+            return
+
+        parser = RoadmapParser()
+        emitted = False
+        reason = None
+        if self._can_degrade() and not self.breaker.allow():
+            reason = "breaker_open"
+        else:
+            try:
+                async with self.admission.slot(deadline):
+                    chunks = await self._open_stream(prompt)
+                    if chunks is not None:
+                        async with aclosing(chunks):
+                            async for chunk in chunks:
+                                # Error messages arrive as a finished dictionary
+                                if isinstance(chunk, dict):
+                                    yield "roadmap", chunk
+                                    return
+                                for parent_id, node in parser.feed(chunk):
+                                    emitted = True
+                                    yield "node", {"parent_id": parent_id, "node": node}
+            except AdmissionRejected:
+                if not self._can_degrade():
+                    raise
+                reason = "overload"
+            except Exception:
+                self.breaker.record_failure()
+                # Nodes already sent cannot be taken back, so only a clean start falls back
+                if emitted or not self._can_degrade():
+                    raise
+                reason = "failure"
+
+        if reason is None:
+            for parent_id, node in parser.close():
+                yield "node", {"parent_id": parent_id, "node": node}
+            topics = parser.topics
+            if topics:
+                self.breaker.record_success()
+                self._remember(prompt, cache_key, topics)
+                yield "roadmap", self._build_roadmap(prompt, topics)
+                return
+            self.breaker.record_failure()
+            if not self._can_degrade():
+                yield "roadmap", self._build_roadmap(prompt, topics)
+                return
+            reason = "failure"
+
+        topics = await self._degraded_topics(prompt, reason)
+        if isinstance(topics, dict):
+            yield "roadmap", topics
+            return
+        for parent_id, node in self._node_events(topics):
+            yield "node", {"parent_id": parent_id, "node": node}
+        yield "roadmap", self._build_roadmap(prompt, topics)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            "catalog": self.catalog.stats(),
+            "cache": self.cache.stats(),
+            "semantic_index": {
+                language: index.stats() for language, index in self.semantic_indexes.items()
+            },
+            "in_flight": self.in_flight.stats(),
+            "providers": self.router.stats(),
+            "admission": self.admission.stats(),
+            "breaker": self.breaker.stats(),
+            "degraded": dict(self.degraded)
+        }
+
+@lru_cache()
+def get_ai_service() -> AIService:
+    return AIService()
@@ -0,0 +1,75 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Awaitable, Dict, Optional
+from starlette.requests import Request
+from app.core.settings import get_settings
+
+class RequestCancelled(Exception):
+    """The client went away (``disconnect``) or the request ran out of time (``deadline``)"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request cancelled: {reason}")
+        self.reason = reason
+
+class CancellationStats:
+    def __init__(self):
+        self.counts: Dict[str, int] = {"disconnect": 0, "deadline": 0}
+
+    def record(self, reason: str) -> None:
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+@lru_cache()
+def get_cancellation_stats() -> CancellationStats:
+    return CancellationStats()
+
+def request_deadline(timeout_header: Optional[str]) -> float:
+    """Seconds the request may take: the X-Request-Timeout header, capped by CHAT_REQUEST_DEADLINE"""
+    deadline = get_settings().CHAT_REQUEST_DEADLINE
+    try:
+        requested = float(timeout_header) if timeout_header else 0.0
+    except ValueError:
+        requested = 0.0
+    if requested > 0:
+        return min(requested, deadline)
+    return deadline
+
+def deadline_at(seconds: float) -> float:
+    """Event loop time ``seconds`` from now, the absolute deadline AIService and admission expect"""
+    return asyncio.get_running_loop().time() + seconds
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Return once the client closes the connection; the body must already have been read"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def run_cancellable(request: Request, work: Awaitable[Any], deadline: float) -> Any:
+    """Await ``work``, cancelling it when the client disconnects or ``deadline`` seconds pass
+
+    Cancellation reaches the provider call, so the upstream completion is
+    aborted and nothing after it (parsing, the chat history write) runs.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {task, watcher}, timeout=deadline, return_when=asyncio.FIRST_COMPLETED
+        )
+    except asyncio.CancelledError:
+        task.cancel()
+        watcher.cancel()
+        raise
+    watcher.cancel()
+    if task in done:
+        return task.result()
+
+    task.cancel()
+    # Let the cancellation unwind so admission slots and connections are free again
+    await asyncio.gather(task, return_exceptions=True)
+    reason = "disconnect" if watcher in done else "deadline"
+    get_cancellation_stats().record(reason)
+    raise RequestCancelled(reason)
@@ -0,0 +1,183 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from app.core.settings import get_settings
+from app.models.chat import ChatHistory as ChatHistoryModel
+from app.services.database_connection_service import AsyncSessionLocal
+
+class ChatHistoryQueueFull(Exception):
+    pass
+
+class ChatHistoryWriter:
+    """Write-behind persistence for chat_history with group commits
+
+    Rows are queued in a bounded queue and a background task inserts them
+    with one multi-row INSERT per batch, flushing whenever ``batch_size``
+    rows are waiting or ``flush_interval`` seconds have passed since the
+    first one arrived. When the queue is full, ``add`` waits up to
+    ``enqueue_timeout`` seconds and then raises ChatHistoryQueueFull.
+
+    A batch that fails is retried with exponential backoff, capped at
+    ``max_retry_delay`` seconds between attempts, for up to ``retry_timeout``
+    seconds. Rows are written in order, so it stays ahead of everything
+    queued after it, and the queue filling up pushes back on new chats
+    while the database is down. Only after that is the batch dropped, and
+    every dropped row is logged.
+    """
+
+    def __init__(
+        self,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        enqueue_timeout: float,
+        retry_timeout: float = 300.0,
+        max_retry_delay: float = 30.0
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.retry_timeout = retry_timeout
+        self.max_retry_delay = max_retry_delay
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        # Rows taken off the queue but not written yet
+        self._writing = 0
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.retries = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop the background task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    @property
+    def pending(self) -> int:
+        """Rows accepted by ``add`` that are not in the database yet"""
+        return self._queue.qsize() + self._writing
+
+    async def flush(self) -> None:
+        """Wait until every row queued before this call has been written
+
+        Raises ChatHistoryQueueFull when that takes longer than
+        ``enqueue_timeout`` seconds, e.g. while a batch is being retried.
+        """
+        if self._task is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.enqueue_timeout
+        done = loop.create_future()
+        try:
+            await asyncio.wait_for(self._queue.put(done), self.enqueue_timeout)
+            await asyncio.wait_for(done, max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            raise ChatHistoryQueueFull("Chat history writes are behind")
+
+    async def add(self, row: Dict[str, Any]) -> None:
+        if self._task is None:
+            # Not running inside the app lifespan (scripts, shells): write directly
+            await self._write([row])
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(row), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ChatHistoryQueueFull("Chat history queue is full")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            if isinstance(row, asyncio.Future):
+                # Flush marker with nothing batched ahead of it
+                if not row.done():
+                    row.set_result(None)
+                continue
+            batch = [row]
+            flushed = []
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                if isinstance(row, asyncio.Future):
+                    flushed.append(row)
+                    break
+                batch.append(row)
+            self._writing = len(batch)
+            try:
+                await self._write(batch)
+            finally:
+                self._writing = 0
+            for done in flushed:
+                if not done.done():
+                    done.set_result(None)
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        loop = asyncio.get_running_loop()
+        give_up = loop.time() + self.retry_timeout
+        delay = 0.5
+        attempt = 1
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(ChatHistoryModel).values(batch))
+                    await db.commit()
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                print(f"Error writing chat history batch of {len(batch)} rows (attempt {attempt}): {str(e)}")
+                if loop.time() + delay > give_up:
+                    break
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+        self.dropped += len(batch)
+        print(f"ERROR: dropped {len(batch)} chat history rows after {attempt} attempts")
+        for row in batch:
+            print(f"ERROR: dropped chat history row {row['id']} of user {row['user_id']}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.pending,
+            "written": self.written,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "retries": self.retries
+        }
+
+@lru_cache()
+def get_chat_history_writer() -> ChatHistoryWriter:
+    settings = get_settings()
+    return ChatHistoryWriter(
+        max_queue=settings.CHAT_HISTORY_QUEUE_SIZE,
+        batch_size=settings.CHAT_HISTORY_BATCH_SIZE,
+        flush_interval=settings.CHAT_HISTORY_FLUSH_INTERVAL,
+        enqueue_timeout=settings.CHAT_HISTORY_ENQUEUE_TIMEOUT,
+        retry_timeout=settings.CHAT_HISTORY_RETRY_TIMEOUT,
+        max_retry_delay=settings.CHAT_HISTORY_MAX_RETRY_DELAY
+    )
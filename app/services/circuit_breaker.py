@@ -0,0 +1,63 @@
+import time
+from typing import Dict, Optional
+
+class CircuitBreaker:
+    """Consecutive-failure breaker in front of the upstream LLM
+
+    After ``threshold`` failures in a row the breaker opens and ``allow``
+    returns False for ``cooldown`` seconds. Then a single probe call is let
+    through; its success closes the breaker, its failure opens it again.
+    A probe that never reports back frees the slot after another cooldown.
+    A threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started: Optional[float] = None
+        self.trips = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None or self.threshold <= 0:
+            return True
+        now = time.monotonic()
+        probe_pending = self.probe_started is not None and now - self.probe_started < self.cooldown
+        if now - self.opened_at < self.cooldown or probe_pending:
+            self.short_circuited += 1
+            return False
+        self.probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_started = None
+        if self.threshold <= 0:
+            return
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited
+        }
@@ -1,17 +1,68 @@
+import os
+import uuid
+import orjson
+from typing import Any, Dict, Tuple
 from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.core.settings import get_settings
 
 settings = get_settings()
 
 POSTGRESQL_DATABASE_URL = f"postgresql+psycopg2://{settings.DATABASE_USER}:{settings.DATABASE_USER_PASSWORD}@{settings.DATABASE_HOST}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}?sslmode=require"
+ASYNC_POSTGRESQL_DATABASE_URL = f"postgresql+asyncpg://{settings.DATABASE_USER}:{settings.DATABASE_USER_PASSWORD}@{settings.DATABASE_HOST}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}"
+
+# Port of the Supabase/PgBouncer transaction pooler (see test.py)
+EXTERNAL_POOLER_PORT = "6543"
+
+def get_pool_mode() -> str:
+    mode = settings.DATABASE_POOL_MODE.lower()
+    if mode == "auto":
+        # An external pooler already multiplexes connections, so don't pool twice
+        return "null" if settings.DATABASE_PORT == EXTERNAL_POOLER_PORT else "queue"
+    return mode
+
+def get_pool_sizes() -> Tuple[int, int]:
+    """(sync, async) pool sizes per worker
+
+    DATABASE_MAX_CONNECTIONS is the budget for the whole app, shared by all
+    workers and by both engines. The sync engine only serves authentication,
+    so it gets DATABASE_SYNC_POOL_SIZE and the chat endpoints' async engine
+    gets the rest of the worker's share.
+    """
+    workers = max(1, int(os.getenv("GUNICORN_WORKERS", "4")))
+    budget = max(2, settings.DATABASE_MAX_CONNECTIONS // workers)
+    sync_size = max(1, min(settings.DATABASE_SYNC_POOL_SIZE, budget - 1))
+    async_size = settings.DATABASE_POOL_SIZE or budget - sync_size
+    return sync_size, async_size
+
+def get_pool_options(asynchronous: bool = False) -> Dict[str, Any]:
+    if get_pool_mode() == "null":
+        return {"poolclass": NullPool}
+
+    return {
+        "poolclass": AsyncAdaptedQueuePool if asynchronous else QueuePool,
+        "pool_size": get_pool_sizes()[1 if asynchronous else 0],
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
+
+def json_serializer(value: Any) -> str:
+    # Pre-serialized roadmaps (see roadmap_serializer) are passed through untouched
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    return orjson.dumps(value).decode()
 
 engine = create_engine(
     POSTGRESQL_DATABASE_URL,
-    poolclass=NullPool,
-    echo=False
+    echo=False,
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
+    **get_pool_options()
 )
 
 sessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -23,4 +74,46 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_async_connect_args() -> Dict[str, Any]:
+    connect_args: Dict[str, Any] = {"ssl": "require"}
+    if settings.DATABASE_PORT == EXTERNAL_POOLER_PORT:
+        # Transaction poolers can't keep asyncpg's named prepared statements around
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    return connect_args
+
+async_engine = create_async_engine(
+    ASYNC_POSTGRESQL_DATABASE_URL,
+    echo=False,
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
+    connect_args=get_async_connect_args(),
+    **get_pool_options(asynchronous=True)
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _pool_stats(pool) -> Dict[str, Any]:
+    if not isinstance(pool, QueuePool):
+        return {"mode": "null"}
+    return {
+        "mode": "queue",
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool counts overflow from -pool_size until the pool is full
+        "overflow": max(pool.overflow(), 0)
+    }
+
+def get_pool_stats() -> Dict[str, Any]:
+    return {
+        "sync": _pool_stats(engine.pool),
+        "async": _pool_stats(async_engine.pool)
+    }
@@ -0,0 +1,199 @@
+import asyncio
+import base64
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Protocol, Tuple
+import httpx
+import orjson
+from google.auth import crypt
+from app.core.settings import get_settings
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+# Tolerated difference between our clock and Google's, in seconds
+CLOCK_SKEW = 10
+# Certificates are refreshed in the background this long before they expire
+REFRESH_MARGIN = 60
+# Delay before the background refresh retries after a failed fetch
+REFRESH_RETRY = 30
+# A token signed with an unknown key forces a refresh at most this often
+MIN_FORCED_REFRESH_INTERVAL = 30
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+class CertSource(Protocol):
+    async def fetch(self) -> Tuple[Dict[str, str], float]:
+        """Return (key id -> PEM certificate, seconds the certificates may be cached)"""
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
+class HttpCertSource:
+    """Google's signing certificates, cached for as long as its Cache-Control header allows"""
+
+    def __init__(self, url: str, default_ttl: float, timeout: float = 10.0):
+        self.url = url
+        self.default_ttl = default_ttl
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def fetch(self) -> Tuple[Dict[str, str], float]:
+        response = await self._client.get(self.url)
+        response.raise_for_status()
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        max_age = float(match.group(1)) if match else self.default_ttl
+        return orjson.loads(response.content), max_age
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _split_token(token: str) -> Tuple[Dict[str, Any], Dict[str, Any], bytes, bytes]:
+    """(header, claims, signed section, signature) of a JWT, without checking anything"""
+    try:
+        header, payload, signature = token.encode().split(b".")
+        return (
+            orjson.loads(_b64decode(header.decode())),
+            orjson.loads(_b64decode(payload.decode())),
+            header + b"." + payload,
+            _b64decode(signature.decode())
+        )
+    except (ValueError, UnicodeError, orjson.JSONDecodeError):
+        raise ValueError("Malformed ID token")
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens locally against cached signing certificates
+
+    Certificates come from ``source`` and are kept for the max-age Google
+    sends. A background task refreshes them shortly before they expire, so
+    a login never waits for Google unless the cache is cold or the token
+    names a key we haven't seen yet (Google rotated its keys). When a
+    refresh fails the previous certificates stay in use. Signatures are
+    checked in a worker thread, off the event loop.
+    """
+
+    def __init__(self, source: CertSource, audience: str):
+        self.source = source
+        self.audience = audience
+        self._verifiers: Dict[str, crypt.Verifier] = {}
+        self._expires_at = 0.0
+        self._last_forced = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.verified = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+        await self.source.aclose()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, self._expires_at - REFRESH_MARGIN - time.monotonic()))
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing Google certificates: {str(e)}")
+                await asyncio.sleep(REFRESH_RETRY)
+
+    async def _fetch(self) -> None:
+        try:
+            certs, max_age = await self.source.fetch()
+            # Parsing the certificates is CPU work too, so it happens off the loop
+            verifiers = await asyncio.to_thread(
+                lambda: {kid: crypt.RSAVerifier.from_string(pem) for kid, pem in certs.items()}
+            )
+        except Exception:
+            self.fetch_errors += 1
+            raise
+        self._verifiers = verifiers
+        self._expires_at = time.monotonic() + max_age
+        self.fetches += 1
+
+    async def refresh(self) -> None:
+        """Fetch the certificates again; concurrent callers share a single fetch"""
+        if self._refreshing is None:
+            task = asyncio.ensure_future(self._fetch())
+            task.add_done_callback(self._refresh_done)
+            self._refreshing = task
+        await asyncio.shield(self._refreshing)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        if self._refreshing is task:
+            self._refreshing = None
+
+    async def _verifier(self, kid: Optional[str]) -> Optional[crypt.Verifier]:
+        now = time.monotonic()
+        if not self._verifiers or now >= self._expires_at:
+            try:
+                await self.refresh()
+            except Exception:
+                # Stale certificates beat failing every login while Google is unreachable
+                if not self._verifiers:
+                    raise ValueError("Google certificates are unavailable")
+        verifier = self._verifiers.get(kid)
+        if verifier is None and kid and now - self._last_forced >= MIN_FORCED_REFRESH_INTERVAL:
+            self._last_forced = now
+            try:
+                await self.refresh()
+            except Exception:
+                return None
+            verifier = self._verifiers.get(kid)
+        return verifier
+
+    def _check_claims(self, claims: Dict[str, Any]) -> None:
+        now = time.time()
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] < now - CLOCK_SKEW:
+            raise ValueError("Token expired")
+        if isinstance(claims.get("iat"), (int, float)) and claims["iat"] > now + CLOCK_SKEW:
+            raise ValueError("Token used too early")
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError("Wrong issuer")
+        audience = claims.get("aud")
+        if audience != self.audience and not (isinstance(audience, list) and self.audience in audience):
+            raise ValueError("Token has wrong audience")
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid ID token for our client id; raises ValueError otherwise"""
+        try:
+            header, claims, signed, signature = _split_token(token)
+            if header.get("alg") != "RS256":
+                raise ValueError("Unsupported token algorithm")
+            verifier = await self._verifier(header.get("kid"))
+            if verifier is None:
+                raise ValueError("Token signed with an unknown key")
+            if not await asyncio.to_thread(verifier.verify, signed, signature):
+                raise ValueError("Invalid token signature")
+            self._check_claims(claims)
+        except ValueError:
+            self.rejected += 1
+            raise
+        self.verified += 1
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._verifiers),
+            "expires_in": round(max(0.0, self._expires_at - time.monotonic()), 1),
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "verified": self.verified,
+            "rejected": self.rejected
+        }
+
+@lru_cache()
+def get_google_token_verifier() -> GoogleTokenVerifier:
+    settings = get_settings()
+    source = HttpCertSource(settings.GOOGLE_CERTS_URL, settings.GOOGLE_CERTS_DEFAULT_TTL)
+    return GoogleTokenVerifier(source, settings.GOOGLE_CLIENT_ID)
@@ -0,0 +1,92 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from cachetools import TTLCache
+from app.core.settings import get_settings
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used by the same user for a different request"""
+
+class _Entry:
+    def __init__(self, fingerprint: str, future: asyncio.Future):
+        self.fingerprint = fingerprint
+        self.future = future
+
+class IdempotencyStore:
+    """Results of recent requests by (user_id, Idempotency-Key), kept for ``ttl`` seconds
+
+    The first request with a key runs; duplicates that arrive while it is
+    in progress wait for its result, later ones get the stored result
+    back. ``func`` runs in its own task, so it keeps going when the caller
+    that started it is cancelled (the client went away) and a retry can
+    still attach to it; bound ``func`` itself if it must not run forever.
+    If ``func`` fails its key is released, and a waiting duplicate runs the
+    request itself. Keys live in the worker's memory, so duplicates are
+    only caught on the same worker.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.executed = 0
+        self.attached = 0
+        self.replayed = 0
+        self.conflicts = 0
+
+    async def run(
+        self,
+        scope: Hashable,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Return ``(result, replayed)``; ``replayed`` is False only for the call that ran ``func``"""
+        scoped_key = (scope, key)
+        while True:
+            entry = self._entries.get(scoped_key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyKeyReused("Idempotency-Key was already used for a different request")
+            if entry.future.done() and not entry.future.cancelled():
+                self.replayed += 1
+                return entry.future.result(), True
+            try:
+                result = await asyncio.shield(entry.future)
+            except asyncio.CancelledError:
+                if not entry.future.cancelled():
+                    # This duplicate itself was cancelled
+                    raise
+                # The original request failed or went away: try to take over
+                continue
+            self.attached += 1
+            return result, True
+
+        entry = _Entry(fingerprint, asyncio.get_running_loop().create_future())
+        self._entries[scoped_key] = entry
+        self.executed += 1
+        task = asyncio.ensure_future(func())
+        task.add_done_callback(lambda done: self._finished(scoped_key, entry, done))
+        return await asyncio.shield(task), False
+
+    def _finished(self, scoped_key: Tuple, entry: _Entry, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is None:
+            entry.future.set_result(task.result())
+            return
+        if self._entries.get(scoped_key) is entry:
+            del self._entries[scoped_key]
+        entry.future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "keys": len(self._entries),
+            "executed": self.executed,
+            "attached": self.attached,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts
+        }
+
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    settings = get_settings()
+    return IdempotencyStore(settings.IDEMPOTENCY_MAX_KEYS, settings.IDEMPOTENCY_TTL)
@@ -0,0 +1,167 @@
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from passlib.context import CryptContext
+from app.core.settings import get_settings
+
+class HasherBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Too many logins in progress")
+        self.retry_after = retry_after
+
+@lru_cache()
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+# The two functions below run in the pool's worker processes
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed)
+
+class PasswordHasher:
+    """bcrypt in a dedicated process pool, so hashing never holds this worker's GIL
+
+    At most ``workers`` hashes run at once and ``max_queue`` more may wait.
+    Beyond that, or after waiting ``timeout`` seconds, calls raise
+    HasherBusy right away instead of piling up behind a login burst.
+    If a worker process dies the pool is replaced and the hash is tried
+    once more on the new one.
+    The methods block the calling thread, so sync routes call them
+    directly and they keep running in the threadpool.
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int, timeout: float):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Moving average of one hash, for Retry-After estimates
+        self._average = 0.25
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers don't inherit the app's threads, sockets or DB pools
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Drop ``broken`` so the next call spawns a new pool, unless another thread already did"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self.restarts += 1
+        print("Password hashing pool broke, starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> None:
+        """Spawn the workers and load bcrypt in them now rather than on the first login"""
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_context, self.rounds)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.in_flight / self.workers * self._average))
+
+    def _release(self, _future: Optional[Future] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _busy(self) -> HasherBusy:
+        self.rejected += 1
+        return HasherBusy(self.retry_after())
+
+    def _run(self, func, *args) -> Any:
+        if not self._slots.acquire(blocking=False):
+            raise self._busy()
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                try:
+                    future = executor.submit(func, *args, self.rounds)
+                except RuntimeError:
+                    # Another thread shut this pool down while replacing it
+                    raise BrokenProcessPool("Password hashing pool was shut down")
+                result = future.result(timeout=max(0.0, started + self.timeout - time.monotonic()))
+            except FutureTimeoutError:
+                # cancel() cannot stop a hash that already started, so the slot
+                # stays taken until its process is free again
+                future.cancel()
+                future.add_done_callback(self._release)
+                raise self._busy()
+            except BrokenProcessPool:
+                # A worker was killed (OOM, signal); every pending future fails with it
+                self._replace_executor(executor)
+                if attempt:
+                    self._release()
+                    raise self._busy()
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release()
+            break
+        self._average = 0.8 * self._average + 0.2 * (time.monotonic() - started)
+        self.completed += 1
+        return result
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when ``hashed`` used another cost"""
+        valid, new_hash = self._run(_verify_and_update, password, hashed)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "restarts": self.restarts,
+            "average_seconds": round(self._average, 3)
+        }
+
+@lru_cache()
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(
+        settings.PASSWORD_HASH_WORKERS,
+        settings.PASSWORD_HASH_QUEUE,
+        settings.BCRYPT_ROUNDS,
+        settings.PASSWORD_HASH_TIMEOUT
+    )
@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Optional
+from cachetools import TLRUCache, TTLCache
+from app.core.settings import get_settings
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The columns of a users row that authentication needs"""
+    id: int
+    email: str
+    hashed_password: Optional[str]
+
+    @classmethod
+    def from_row(cls, user) -> "UserSnapshot":
+        return cls(id=user.id, email=user.email, hashed_password=user.hashed_password)
+
+class _CountingCache:
+    """A cachetools cache behind a lock, with hit/miss counters
+
+    Routes that use these caches are sync and run in the threadpool,
+    and cachetools caches are not thread-safe on their own.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+def _until_exp(_key, claims: Dict[str, Any], now: float) -> float:
+    return claims["exp"]
+
+class TokenClaimsCache(_CountingCache):
+    """Decoded access token claims by token digest, each kept until the token's ``exp``"""
+
+    def __init__(self, maxsize: int):
+        super().__init__(TLRUCache(maxsize=maxsize, ttu=_until_exp, timer=time.time))
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        # Raw tokens are bearer credentials, so they are never kept in memory as keys
+        return hashlib.sha256(token.encode()).digest()
+
+    def get_or_decode(self, token: str, decode: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Claims of ``token``; ``decode`` runs on a miss and may raise to reject the token"""
+        key = self.digest(token)
+        claims = self.get(key)
+        if claims is None:
+            claims = decode(token)
+            # Tokens without an expiry are verified every time
+            if isinstance(claims.get("exp"), (int, float)):
+                self.put(key, claims)
+        return dict(claims)
+
+class UserCache(_CountingCache):
+    """Users by email for ``ttl`` seconds; only existing users are cached
+
+    Call ``invalidate`` whenever a user is created, deleted or changes
+    password. Other workers still see the old snapshot until it expires.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(TTLCache(maxsize=maxsize, ttl=ttl))
+
+@lru_cache()
+def get_token_claims_cache() -> TokenClaimsCache:
+    return TokenClaimsCache(get_settings().TOKEN_CACHE_SIZE)
+
+@lru_cache()
+def get_user_cache() -> UserCache:
+    settings = get_settings()
+    return UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
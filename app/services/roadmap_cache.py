@@ -0,0 +1,43 @@
+from typing import Any, Dict, Optional
+from cachetools import TTLCache
+from app.ai_integration.classifier import detect_language, normalize_prompt
+
+class RoadmapCache:
+    """Bounded TTL + LRU cache of generated roadmaps keyed by normalized prompt"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str) -> str:
+        return f"{detect_language(prompt)}:{normalize_prompt(prompt)}"
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Like get, without counting the lookup"""
+        return self._entries.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,98 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import orjson
+
+CATALOG_FORMAT = 1
+
+class RoadmapCatalog:
+    """Read-only store of pre-generated roadmaps for the most requested prompts
+
+    The catalog is a JSON file built offline by ``scripts/build_roadmap_catalog``
+    and loaded once per worker at startup. Entries are keyed like the
+    RoadmapCache ("lang:normalized prompt") and hold topics without the
+    root, so a lookup is a single dictionary access. Unlike the cache,
+    entries never expire; a new file with a higher version replaces them.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.generated_at: Optional[str] = None
+        self.path: Optional[str] = None
+        self._entries: Dict[str, List[Dict]] = {}
+        self._prompts: Dict[str, str] = {}
+        self.hits = 0
+
+    def load(self, path: str) -> bool:
+        """Replace the entries with the file at ``path``; a missing file leaves the catalog empty"""
+        try:
+            with open(path, "rb") as f:
+                store = orjson.loads(f.read())
+        except FileNotFoundError:
+            print(f"Roadmap catalog not found at {path}, starting without it")
+            return False
+        if store.get("format") != CATALOG_FORMAT:
+            print(f"Ignoring roadmap catalog {path} with unsupported format {store.get('format')}")
+            return False
+
+        entries = store["entries"]
+        self._entries = {key: entry["topics"] for key, entry in entries.items()}
+        self._prompts = {key: entry["prompt"] for key, entry in entries.items()}
+        self.version = store.get("version", 0)
+        self.generated_at = store.get("generated_at")
+        self.path = path
+        print(f"Loaded roadmap catalog v{self.version} with {len(self._entries)} entries")
+        return True
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        topics = self._entries.get(key)
+        if topics is not None:
+            self.hits += 1
+        return topics
+
+    def peek(self, key: str) -> Optional[List[Dict]]:
+        """Like get, without counting the lookup"""
+        return self._entries.get(key)
+
+    def prompts(self) -> Iterator[Tuple[str, str]]:
+        """(key, representative prompt) pairs, for indexing near-duplicates"""
+        return iter(self._prompts.items())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "generated_at": self.generated_at,
+            "size": len(self._entries),
+            "hits": self.hits
+        }
+
+def read_catalog_version(path: str) -> int:
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read()).get("version", 0)
+    except FileNotFoundError:
+        return 0
+
+def write_catalog(path: str, entries: Dict[str, Dict[str, Any]], version: int) -> None:
+    """Atomically replace the catalog file; ``entries`` maps key to {"prompt", "count", "topics"}"""
+    store = {
+        "format": CATALOG_FORMAT,
+        "version": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "entries": entries
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Workers may be reading the old file while the new one is written
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(store))
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
@@ -0,0 +1,142 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+_TOPIC = re.compile(r'^\d+\.')
+_SUBTOPIC = re.compile(r'^[a-z]\)')
+_SUBTOPIC_MARKER = re.compile(r'^[a-z]\)\s*')
+_LABEL = re.compile(r'^.*?:\s*')
+_DESCRIPTION_LABEL = re.compile(r'^Description:\s*')
+_URL = re.compile(r'https?://[^\s]+')
+_BRACKETED = re.compile(r'\[(.*?)\]')
+_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+# (parent_id, node) pairs handed out as soon as a node can no longer change
+NodeEvent = Tuple[str, Dict]
+
+def create_id(title: str) -> str:
+    return _NON_ALPHANUMERIC.sub('-', title.lower()).strip('-')
+
+def parse_resource(line: str) -> Dict:
+    line_lower = line.lower()
+    resource_type = "article"
+    if "video" in line_lower or "youtube" in line_lower:
+        resource_type = "video"
+    elif "course" in line_lower or "tutorial" in line_lower:
+        resource_type = "course"
+
+    url_match = _URL.search(line)
+    url = url_match.group(0) if url_match else "https://roadmap.sh"
+
+    title_match = _BRACKETED.search(line)
+    if title_match:
+        title = title_match.group(1)
+    else:
+        title = line.split('Resource:', 1)[-1].split('http')[0].strip()
+        if not title:
+            title = "Learning Resource"
+
+    return {
+        "title": title,
+        "url": url,
+        "type": resource_type
+    }
+
+class RoadmapParser:
+    """Incremental parser for the numbered roadmap format requested from the LLM
+
+    Text can be fed in arbitrary chunks; only whole lines are interpreted.
+    ``feed`` and ``close`` return the nodes that were finished by that
+    input: a topic once its first subtopic or the next topic starts, a
+    subtopic once the next subtopic or topic starts. ``topics`` holds the
+    full tree, identical to what AIService._parse_topics used to build.
+    """
+
+    def __init__(self):
+        self.topics: List[Dict] = []
+        self._buffer = ""
+        self._topic: Optional[Dict] = None
+        self._subtopic: Optional[Dict] = None
+        self._topic_pending = False
+
+    def feed(self, chunk: str) -> List[NodeEvent]:
+        self._buffer += chunk
+        if '\n' not in chunk:
+            return []
+        *lines, self._buffer = self._buffer.split('\n')
+        events: List[NodeEvent] = []
+        for line in lines:
+            self._feed_line(line, events)
+        return events
+
+    def close(self) -> List[NodeEvent]:
+        events: List[NodeEvent] = []
+        self._feed_line(self._buffer, events)
+        self._buffer = ""
+        self._finish_topic(events)
+        self._finish_subtopic(events)
+        return events
+
+    def _finish_topic(self, events: List[NodeEvent]) -> None:
+        if self._topic_pending:
+            node = {key: value for key, value in self._topic.items() if key != "children"}
+            events.append(("root", node))
+            self._topic_pending = False
+
+    def _finish_subtopic(self, events: List[NodeEvent]) -> None:
+        if self._subtopic is not None:
+            events.append((self._topic["id"], self._subtopic))
+            self._subtopic = None
+
+    def _feed_line(self, line: str, events: List[NodeEvent]) -> None:
+        line = line.strip()
+        if not line:
+            return
+
+        # Main topic (starts with number)
+        if _TOPIC.match(line):
+            self._finish_topic(events)
+            self._finish_subtopic(events)
+            topic_name = _LABEL.sub('', line.split('.', 1)[1].strip(), count=1)
+            self._topic = {
+                "id": create_id(topic_name),
+                "title": topic_name,
+                "description": "",
+                "resources": [],
+                "children": []
+            }
+            self._topic_pending = True
+            self.topics.append(self._topic)
+
+        # Subtopic
+        elif _SUBTOPIC.match(line):
+            if self._topic is not None:
+                self._finish_topic(events)
+                self._finish_subtopic(events)
+                subtopic_name = _LABEL.sub('', _SUBTOPIC_MARKER.sub('', line, count=1), count=1)
+                self._subtopic = {
+                    "id": create_id(subtopic_name),
+                    "title": subtopic_name,
+                    "description": "",
+                    "resources": []
+                }
+                self._topic["children"].append(self._subtopic)
+
+        # Resource line
+        elif 'Resource:' in line or 'http' in line.lower():
+            resource = parse_resource(line)
+            target = self._subtopic if self._subtopic is not None else self._topic
+            if target is not None:
+                target["resources"].append(resource)
+
+        # Description line
+        elif line[0] == '-':
+            description = _DESCRIPTION_LABEL.sub('', line.lstrip('- ').strip(), count=1)
+            target = self._subtopic if self._subtopic is not None else self._topic
+            if target is not None:
+                target["description"] = description
+
+def parse_topics(content: str) -> List[Dict]:
+    parser = RoadmapParser()
+    parser.feed(content)
+    parser.close()
+    return parser.topics
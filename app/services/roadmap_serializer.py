@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+import orjson
+
+# Roadmaps are serialized once when they are created. The bytes are stored
+# as-is in the chat_history JSON column (PostgreSQL keeps json text verbatim)
+# and spliced back into responses without decoding or revalidating them.
+
+def serialize_data(data: Dict[str, Any]) -> bytes:
+    return orjson.dumps(data)
+
+def stored_response(data: bytes) -> bytes:
+    """Body of the chat_history.response column"""
+    return b'{"data":' + data + b'}'
+
+def chat_response_body(data: bytes) -> bytes:
+    """Body of a ChatResponse"""
+    return b'{"message":null,"data":' + data + b'}'
+
+def normalize_stored_text(raw: Optional[str]) -> str:
+    """Return a stored response as a JSON object text"""
+    # Older rows may hold the response as a JSON-encoded string
+    if raw and raw[0] == '"':
+        raw = orjson.loads(raw)
+    if not raw or raw.lstrip()[:1] != '{':
+        return '{}'
+    return raw
+
+def chat_history_body(
+    chat_id: UUID,
+    user_id: int,
+    prompt: str,
+    created_at: datetime,
+    raw_response: Optional[str]
+) -> bytes:
+    """Body of a ChatHistory, embedding the stored response without parsing it"""
+    return orjson.dumps({
+        "id": chat_id,
+        "user_id": user_id,
+        "prompt": prompt,
+        "response": orjson.Fragment(normalize_stored_text(raw_response)),
+        "created_at": created_at
+    })
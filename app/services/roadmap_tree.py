@@ -0,0 +1,25 @@
+from typing import Dict, List, Optional
+
+def find_path(root: Dict, node_id: str) -> Optional[List[Dict]]:
+    """Nodes from ``root`` down to the first node with ``node_id``, depth first"""
+    stack = [(root, [root])]
+    while stack:
+        node, path = stack.pop()
+        if node.get("id") == node_id:
+            return path
+        # Reversed so siblings are visited in document order
+        for child in reversed(node.get("children") or []):
+            stack.append((child, path + [child]))
+    return None
+
+def merge_children(node: Dict, children: List[Dict]) -> List[Dict]:
+    """Append the children whose id ``node`` does not have yet; returns the ones added"""
+    current = node.setdefault("children", [])
+    known = {child["id"] for child in current}
+    added = []
+    for child in children:
+        if child["id"] not in known:
+            known.add(child["id"])
+            current.append(child)
+            added.append(child)
+    return added
@@ -0,0 +1,113 @@
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.ai_integration.classifier import normalize_prompt
+
+_SEPARATORS = re.compile(r'[^a-z0-9]+')
+# Technologies whose name is only told apart by a symbol; spelled out before
+# punctuation is removed so "c#", "c++" and "c" stay different prompts
+_SYMBOL_NAMES = re.compile(r'\bc\+\+|\b[a-z]#|\.net\b')
+
+def _spell_symbol(match: re.Match) -> str:
+    name = match.group()
+    if name == "c++":
+        return "cpp"
+    if name == ".net":
+        return "dotnet"
+    return name[0] + "sharp"
+
+class SemanticIndex:
+    """In-memory near-duplicate index over hashed character n-gram vectors
+
+    Each prompt is folded (case, accents, spaces and punctuation removed,
+    after spelling out names such as "c++" or ".net") and becomes an L2-normalised vector of log-scaled character n-gram
+    counts hashed into ``dim`` buckets, so cosine similarity is a single
+    matrix-vector product. Rows live in a fixed-size ring buffer:
+    once ``capacity`` prompts are stored the oldest one is overwritten.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        dim: int = 512,
+        threshold: float = 0.88,
+        ngram_range: Tuple[int, int] = (2, 4)
+    ):
+        self.capacity = capacity
+        self.dim = dim
+        self.threshold = threshold
+        self.ngram_range = ngram_range
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._keys: List[Optional[str]] = [None] * capacity
+        self._rows: Dict[str, int] = {}
+        self._next_row = 0
+        self._size = 0
+        self.lookups = 0
+        self.matches = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def vectorize(self, text: str) -> np.ndarray:
+        folded = _SYMBOL_NAMES.sub(_spell_symbol, normalize_prompt(text))
+        padded = f" {_SEPARATORS.sub('', folded)} "
+        buckets = [
+            zlib.crc32(padded[i:i + n].encode()) % self.dim
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1)
+            for i in range(len(padded) - n + 1)
+        ]
+        vector = np.log1p(np.bincount(buckets, minlength=self.dim)).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, key: str, text: str) -> None:
+        row = self._rows.get(key)
+        if row is None:
+            row = self._next_row
+            evicted = self._keys[row]
+            if evicted is not None:
+                del self._rows[evicted]
+            self._keys[row] = key
+            self._rows[key] = row
+            self._next_row = (row + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+        self._vectors[row] = self.vectorize(text)
+
+    def remove(self, key: str) -> None:
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._keys[row] = None
+            self._vectors[row] = 0
+
+    def _top(self, scores: np.ndarray, limit: int) -> List[Tuple[str, float]]:
+        candidates = np.flatnonzero(scores >= self.threshold)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        ranked = candidates[np.argsort(scores[candidates])[::-1]]
+        return [(self._keys[i], float(scores[i])) for i in ranked if self._keys[i] is not None]
+
+    def search(self, text: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` stored keys at or above the threshold, best first"""
+        return self.search_batch([text], limit)[0]
+
+    def search_batch(self, texts: Sequence[str], limit: int = 3) -> List[List[Tuple[str, float]]]:
+        if not texts:
+            return []
+        self.lookups += len(texts)
+        if not self._size:
+            return [[] for _ in texts]
+        queries = np.stack([self.vectorize(text) for text in texts])
+        scores = self._vectors[:self._size] @ queries.T
+        results = [self._top(scores[:, column], limit) for column in range(len(texts))]
+        self.matches += sum(1 for result in results if result)
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": self._size,
+            "capacity": self.capacity,
+            "lookups": self.lookups,
+            "matches": self.matches,
+            "memory_bytes": self._vectors.nbytes
+        }
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task
+
+    Every caller awaits the shared task through a shield, so one caller
+    being cancelled does not affect the others. The task itself is only
+    cancelled once nobody is waiting for it anymore. Results and errors are
+    not remembered: the key is released as soon as the task finishes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _release(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _on_done(self, key: str, call: _Call, task: asyncio.Task) -> None:
+        self._release(key, call)
+        # Mark the error as retrieved when every waiter has already gone
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            call.task.add_done_callback(lambda task: self._on_done(key, call, task))
+            self._calls[key] = call
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._release(key, call)
+                call.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced
+        }
@@ -1,7 +1,27 @@
+import gc
 import os
 
 workers = int(os.getenv("GUNICORN_WORKERS", "4"))
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 worker_class = "uvicorn.workers.UvicornWorker"
 keepalive = 120
-timeout = 120 
\ No newline at end of file
+timeout = 120
+# Import the app once in the master; workers share its pages copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Providers are lazy in the app itself; import the configured ones before forking too
+    from app.ai_integration.factory import AIProviderFactory
+    AIProviderFactory.preload()
+    # Keep the garbage collector from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Never share a pooled connection the master may have opened with the workers
+    from app.services.database_connection_service import async_engine, engine
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
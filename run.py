@@ -1,6 +1,9 @@
 import uvicorn
 import os
+from app.models.schema import create_schema
 
 if __name__ == "__main__":
+    # Deploys run scripts.bootstrap_schema as a release step instead
+    create_schema()
     port = int(os.getenv("PORT", 8000))
     uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True) 
\ No newline at end of file
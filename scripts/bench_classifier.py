@@ -0,0 +1,70 @@
+"""Throughput of the career classifier against the original keyword scans
+
+The reference implementation and the labelled cases live in
+tests/test_classifier.py (run them with ``python -m pytest``). The cases
+must all be classified as expected before anything is timed; cases where
+the original got it wrong are listed.
+
+The token matcher is correct where the substring scans were not, but it
+is not faster: uncached it measures anywhere from 0.84x to about 1.2x the
+old scans depending on the machine and run. Any speedup in production comes
+only from the lru_cache on repeated prompts.
+
+Usage: python -m scripts.bench_classifier [--prompts 20000]
+"""
+import argparse
+import random
+import time
+from app.ai_integration.classifier import classify
+from tests.test_classifier import CASES, legacy_detect_language, legacy_is_tech_career
+
+ROLES = ["developer", "engineer", "desarrollador", "ingeniero", "analista", "tester", "chef", "cook"]
+AREAS = ["frontend", "backend", "data", "datos", "cloud", "móvil", "pastry", "garden", "react native"]
+LEADS = ["", "senior", "junior", "quiero ser", "I want to become a", "how to become a"]
+
+def check_golden() -> int:
+    failures = 0
+    for prompt, is_tech, language in CASES:
+        result = classify(prompt)
+        if (result.is_tech, result.language) != (is_tech, language):
+            print(f"MISMATCH {prompt!r}: got {result}, expected ({is_tech}, {language})")
+            failures += 1
+        legacy = (legacy_is_tech_career(prompt), legacy_detect_language(prompt))
+        if legacy != (is_tech, language):
+            print(f"  fixed: {prompt!r} was classified as {legacy}")
+    return failures
+
+def synthetic_prompts(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(LEADS)} {rng.choice(AREAS)} {rng.choice(ROLES)} {i}".strip()
+        for i in range(count)
+    ]
+
+def throughput(func, prompts) -> float:
+    started = time.perf_counter()
+    for prompt in prompts:
+        func(prompt)
+    return len(prompts) / (time.perf_counter() - started)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompts", type=int, default=20000)
+    args = parser.parse_args()
+
+    failures = check_golden()
+    if failures:
+        raise SystemExit(f"{failures} golden cases failed")
+    print(f"{len(CASES)} golden cases passed")
+
+    prompts = synthetic_prompts(args.prompts)
+    legacy = throughput(lambda p: (legacy_is_tech_career(p), legacy_detect_language(p)), prompts)
+    uncached = throughput(classify.__wrapped__, prompts)
+    classify.cache_clear()
+    classify(prompts[0])
+    cached = throughput(classify, [prompts[0]] * len(prompts))
+    print(f"legacy scans        {legacy:12,.0f} prompts/s")
+    print(f"token matcher       {uncached:12,.0f} prompts/s  ({uncached / legacy:.2f}x uncached)")
+    print(f"repeated prompt     {cached:12,.0f} prompts/s  ({cached / legacy:.2f}x, lru_cache hit)")
+    print("Uncached, the matcher is not reliably faster than the legacy scans (it has measured as low")
+    print("as 0.84x); the speedup only applies to repeated prompts served from the lru_cache.")
@@ -0,0 +1,36 @@
+"""Micro-benchmark of RoadmapParser against the original _parse_topics
+
+The reference implementation and the golden equivalence tests live in
+tests/test_roadmap_parser.py (run them with ``python -m pytest``).
+
+Usage: python -m scripts.bench_roadmap_parser [--lines 5000] [--repeat 20]
+"""
+import argparse
+import time
+from app.services.roadmap_parser import parse_topics
+from tests.test_roadmap_parser import legacy_parse_topics, synthetic_roadmap
+
+def timed(func, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    large = [synthetic_roadmap(n, seed=n) for n in (50, 500, args.lines)]
+    for text in large:
+        assert parse_topics(text) == legacy_parse_topics(text), "parsers disagree; run the tests"
+        lines = text.count("\n") + 1
+        legacy = timed(legacy_parse_topics, text, args.repeat)
+        current = timed(parse_topics, text, args.repeat)
+        print(
+            f"{lines:>6} lines  legacy={legacy * 1e3:8.3f} ms  "
+            f"incremental={current * 1e3:8.3f} ms  speedup={legacy / current:5.2f}x"
+        )
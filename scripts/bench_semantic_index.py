@@ -0,0 +1,83 @@
+"""Lookup latency of SemanticIndex at 10k and 100k stored prompts
+
+Also checks that prompts which must get different roadmaps stay below
+the match threshold; exits with status 1 when one of them would match.
+
+Usage: python -m scripts.bench_semantic_index [--dim 512] [--queries 200]
+"""
+import argparse
+import random
+import sys
+import time
+from app.services.semantic_index import SemanticIndex
+
+ROLES = [
+    "developer", "engineer", "architect", "analyst", "designer", "tester",
+    "desarrollador", "ingeniero", "arquitecto", "analista", "administrador"
+]
+AREAS = [
+    "frontend", "backend", "full stack", "mobile", "cloud", "data", "machine learning",
+    "devops", "security", "game", "blockchain", "qa", "react", "python", "java",
+    "kubernetes", "aws", "azure", "android", "ios", "embedded", "web", "redes"
+]
+LEVELS = ["", "junior", "senior", "lead", "entry level", "principal"]
+# Prompt pairs that must never share a roadmap
+NEGATIVE_PAIRS = [
+    ("c developer", "c# developer"),
+    ("c developer", "c++ developer"),
+    ("c# developer", "c++ developer"),
+    ("f# developer", "f developer"),
+    ("net developer", ".net developer"),
+    ("java developer", "javascript developer"),
+    ("desarrollador c", "desarrollador c#"),
+]
+
+def synthetic_prompts(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(count):
+        words = [rng.choice(LEVELS), rng.choice(AREAS), rng.choice(AREAS), rng.choice(ROLES)]
+        yield f"{' '.join(w for w in words if w)} {i}"
+
+def bench(size: int, dim: int, queries: int) -> None:
+    index = SemanticIndex(size, dim=dim)
+    started = time.perf_counter()
+    for i, prompt in enumerate(synthetic_prompts(size)):
+        index.add(f"en:{i}", prompt)
+    build = time.perf_counter() - started
+
+    probes = [f"{p} dev" for p in synthetic_prompts(queries, seed=11)]
+    started = time.perf_counter()
+    for probe in probes:
+        index.search(probe)
+    single = (time.perf_counter() - started) / queries
+
+    started = time.perf_counter()
+    index.search_batch(probes)
+    batched = (time.perf_counter() - started) / queries
+
+    print(
+        f"{size:>7} prompts  dim={dim}  memory={index.stats()['memory_bytes'] / 2**20:6.1f} MiB  "
+        f"build={build:6.2f}s  search={single * 1e3:7.3f} ms/query  "
+        f"batched={batched * 1e3:7.3f} ms/query"
+    )
+
+def check_negatives(dim: int) -> bool:
+    index = SemanticIndex(1, dim=dim)
+    ok = True
+    for first, second in NEGATIVE_PAIRS:
+        score = float(index.vectorize(first) @ index.vectorize(second))
+        matches = score >= index.threshold
+        ok = ok and not matches
+        print(f"{'MATCH' if matches else 'ok':>5}  {score:.3f}  {first!r} vs {second!r}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    negatives_ok = check_negatives(args.dim)
+    for size in (10_000, 100_000):
+        bench(size, args.dim, args.queries)
+    if not negatives_ok:
+        sys.exit(1)
@@ -0,0 +1,58 @@
+"""Cold import time of app.main in fresh interpreters
+
+Compares importing the app as workers now do (providers load on first
+use) with importing it and every configured provider up front, which is
+what each worker paid before and what the gunicorn master now pays once
+with preload_app. No database or LLM connection is made.
+
+Usage: python -m scripts.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+if {preload}:
+    from app.ai_integration.factory import AIProviderFactory
+    AIProviderFactory.preload()
+print(json.dumps({{
+    "app": imported - started,
+    "total": time.perf_counter() - started,
+    "modules": len(sys.modules),
+    "langchain": "langchain_openai" in sys.modules
+}}))
+"""
+
+def measure(preload: bool, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", SNIPPET.format(preload=preload)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "app": statistics.median(s["app"] for s in samples),
+        "total": statistics.median(s["total"] for s in samples),
+        "modules": samples[-1]["modules"],
+        "langchain": samples[-1]["langchain"]
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, preload in (("lazy providers", False), ("eager providers", True)):
+        result = measure(preload, args.runs)
+        print(
+            f"{label:16} {result['total'] * 1000:8.0f} ms"
+            f"  (app.main {result['app'] * 1000:.0f} ms, {result['modules']} modules,"
+            f" langchain loaded: {result['langchain']})"
+        )
@@ -0,0 +1,16 @@
+"""Create the database tables and indexes the API needs
+
+Runs as the Procfile release step, once per deploy, so workers never
+inspect or change the schema while they start.
+
+Usage: python -m scripts.bootstrap_schema
+"""
+from app.models.schema import create_schema
+from app.services.database_connection_service import engine
+
+if __name__ == "__main__":
+    try:
+        create_schema()
+    finally:
+        engine.dispose()
+    print("Database schema is up to date")
@@ -0,0 +1,115 @@
+"""Rebuild the pre-generated roadmap catalog from the most requested prompts
+
+Prompts in chat_history are grouped by their RoadmapCache key, the top
+--size keys are generated once through the configured providers, and
+ROADMAP_CATALOG_PATH is atomically replaced with the next version.
+Workers load the new file on their next start.
+
+Usage: python -m scripts.build_roadmap_catalog [--size 200] [--output PATH]
+       [--concurrency 4] [--reuse-history]
+
+--reuse-history takes each prompt's latest stored roadmap instead of
+calling the LLM.
+"""
+import argparse
+import asyncio
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import orjson
+from sqlalchemy import Text, cast, func, select
+from app.ai_integration.factory import AIProviderFactory
+from app.core.settings import get_settings
+from app.models.chat import ChatHistory
+from app.services.ai_service import AIService
+from app.services.database_connection_service import AsyncSessionLocal, async_engine
+from app.services.roadmap_cache import RoadmapCache
+from app.services.roadmap_catalog import read_catalog_version, write_catalog
+from app.services.roadmap_serializer import normalize_stored_text
+
+# Raw prompts are fetched generously because several of them share one key
+MINING_FACTOR = 5
+
+async def top_prompts(size: int) -> List[Tuple[str, int, List[str]]]:
+    """(key, request count, raw prompts) for the most requested keys"""
+    count = func.count(ChatHistory.id)
+    query = (
+        select(ChatHistory.prompt, count)
+        .group_by(ChatHistory.prompt)
+        .order_by(count.desc())
+        .limit(size * MINING_FACTOR)
+    )
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query)).all()
+
+    counts: Counter = Counter()
+    variants: Dict[str, Counter] = {}
+    for prompt, requests in rows:
+        key = RoadmapCache.make_key(prompt)
+        counts[key] += requests
+        variants.setdefault(key, Counter())[prompt] += requests
+    return [
+        (key, requests, [prompt for prompt, _ in variants[key].most_common()])
+        for key, requests in counts.most_common(size)
+    ]
+
+async def stored_topics(prompts: List[str]) -> Optional[List]:
+    query = (
+        select(cast(ChatHistory.response, Text))
+        .where(ChatHistory.prompt.in_(prompts))
+        .order_by(ChatHistory.created_at.desc())
+        .limit(1)
+    )
+    async with AsyncSessionLocal() as db:
+        raw = (await db.execute(query)).scalar_one_or_none()
+    data = orjson.loads(normalize_stored_text(raw)).get("data") or {}
+    if data.get("id") == "error":
+        return None
+    return data.get("children") or None
+
+async def build(size: int, output: str, concurrency: int, reuse_history: bool) -> None:
+    candidates = await top_prompts(size)
+    print(f"Mined {len(candidates)} prompts from chat_history")
+
+    service = AIService()
+    if not reuse_history:
+        await AIProviderFactory.startup(AIProviderFactory.configured_providers())
+    semaphore = asyncio.Semaphore(concurrency)
+    entries: Dict[str, Dict] = {}
+
+    async def add(key: str, requests: int, prompts: List[str]) -> None:
+        async with semaphore:
+            try:
+                if reuse_history:
+                    topics = await stored_topics(prompts)
+                else:
+                    topics = await service.generate_topics(prompts[0])
+            except Exception as e:
+                print(f"Skipping {key}: {str(e)}")
+                return
+        # Error messages and empty trees are never worth precomputing
+        if not topics or isinstance(topics, dict):
+            print(f"Skipping {key}: no roadmap")
+            return
+        entries[key] = {"prompt": prompts[0], "count": requests, "topics": topics}
+
+    try:
+        await asyncio.gather(*(add(*candidate) for candidate in candidates))
+    finally:
+        await AIProviderFactory.shutdown()
+        await async_engine.dispose()
+
+    # Keep the file ordered by popularity, like the mining query
+    ordered = {key: entries[key] for key, _, _ in candidates if key in entries}
+    version = read_catalog_version(output) + 1
+    write_catalog(output, ordered, version)
+    print(f"Wrote roadmap catalog v{version} with {len(ordered)} entries to {output}")
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=settings.ROADMAP_CATALOG_SIZE)
+    parser.add_argument("--output", default=settings.ROADMAP_CATALOG_PATH)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--reuse-history", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(build(args.size, args.output, args.concurrency, args.reuse_history))
@@ -34,9 +34,12 @@ axiosInstance.interceptors.response.use(
   }
 );
 
-export const getChatHistory = async () => {
+// Devuelve una página de resúmenes; pasar next_cursor para la siguiente
+export const getChatHistory = async (cursor?: string, limit = 20) => {
   try {
-    const response = await axiosInstance.get('/chat/history');
+    const response = await axiosInstance.get('/chat/history', {
+      params: { cursor, limit },
+    });
     return response.data;
   } catch (error) {
     if (error instanceof Error && error.message === 'No authentication token found') {
@@ -47,9 +50,12 @@ export const getChatHistory = async () => {
   }
 };
 
-export const createChat = async (prompt: string) => {
+// Reintentar con la misma idempotencyKey no genera ni guarda el chat dos veces
+export const createChat = async (prompt: string, idempotencyKey?: string) => {
   try {
-    const response = await axiosInstance.post('/chat', { prompt });
+    const response = await axiosInstance.post('/chat', { prompt }, {
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
+    });
     return response.data;
   } catch (error) {
     console.error('Error creating chat:', error);
@@ -57,6 +63,27 @@ export const createChat = async (prompt: string) => {
   }
 };
 
+export const getChat = async (chatId: string) => {
+  try {
+    const response = await axiosInstance.get(`/chat/${chatId}`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching chat:', error);
+    throw error;
+  }
+};
+
+// Genera los hijos de un nodo y devuelve el nodo actualizado
+export const expandNode = async (chatId: string, nodeId: string) => {
+  try {
+    const response = await axiosInstance.post(`/chat/${chatId}/nodes/${encodeURIComponent(nodeId)}/expand`);
+    return response.data;
+  } catch (error) {
+    console.error('Error expanding node:', error);
+    throw error;
+  }
+};
+
 export const deleteChat = async (chatId: string) => {
   try {
     const response = await axiosInstance.delete(`/chat/${chatId}`);
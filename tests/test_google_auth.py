@@ -0,0 +1,123 @@
+"""GoogleTokenVerifier against a fake CertSource and locally signed tokens"""
+import asyncio
+import base64
+import time
+from typing import Dict, List, Tuple
+import orjson
+import pytest
+import rsa
+from google.auth import crypt
+from app.services.google_auth import GoogleTokenVerifier
+
+AUDIENCE = "client-id.apps.googleusercontent.com"
+
+def new_key() -> Tuple[crypt.RSASigner, str]:
+    public, private = rsa.newkeys(1024)
+    return crypt.RSASigner.from_string(private.save_pkcs1().decode()), public.save_pkcs1().decode()
+
+def b64(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def sign(signer: crypt.RSASigner, kid: str, **claims) -> str:
+    now = int(time.time())
+    payload = {"iss": "https://accounts.google.com", "aud": AUDIENCE, "iat": now, "exp": now + 3600, "sub": "1"}
+    payload.update(claims)
+    signed = b64(orjson.dumps({"alg": "RS256", "kid": kid, "typ": "JWT"})) + b"." + b64(orjson.dumps(payload))
+    return (signed + b"." + b64(signer.sign(signed))).decode()
+
+class FakeCertSource:
+    """Serves ``certs`` for ``max_age`` seconds; raises while ``failing`` is set"""
+
+    def __init__(self, certs: Dict[str, str], max_age: float = 3600):
+        self.certs = certs
+        self.max_age = max_age
+        self.failing = False
+        self.fetches: List[float] = []
+
+    async def fetch(self):
+        self.fetches.append(time.monotonic())
+        # Lets concurrent callers pile up on the same fetch
+        await asyncio.sleep(0.01)
+        if self.failing:
+            raise ConnectionError("Google is unreachable")
+        return dict(self.certs), self.max_age
+
+    async def aclose(self) -> None:
+        pass
+
+@pytest.fixture(scope="module")
+def keys():
+    return {"k1": new_key(), "k2": new_key()}
+
+def verifier_for(source: FakeCertSource) -> GoogleTokenVerifier:
+    return GoogleTokenVerifier(source, AUDIENCE)
+
+def test_certificates_are_fetched_once_and_reused(keys):
+    source = FakeCertSource({"k1": keys["k1"][1]})
+    verifier = verifier_for(source)
+    token = sign(keys["k1"][0], "k1")
+
+    async def scenario():
+        # A cold cache is filled by a single fetch shared by concurrent logins
+        results = await asyncio.gather(*(verifier.verify(token) for _ in range(5)))
+        await verifier.verify(token)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(claims["sub"] == "1" for claims in results)
+    assert len(source.fetches) == 1
+    assert verifier.stats()["verified"] == 6
+
+def test_stale_certificates_are_used_while_refreshing_fails(keys):
+    source = FakeCertSource({"k1": keys["k1"][1]}, max_age=0)
+    verifier = verifier_for(source)
+    token = sign(keys["k1"][0], "k1")
+
+    async def scenario():
+        await verifier.verify(token)
+        source.failing = True
+        # The certificates expired at once, so this refresh fails
+        return await verifier.verify(token)
+
+    assert asyncio.run(scenario())["sub"] == "1"
+    assert verifier.stats()["fetch_errors"] == 1
+
+def test_cold_cache_without_certificates_rejects(keys):
+    source = FakeCertSource({"k1": keys["k1"][1]})
+    source.failing = True
+    verifier = verifier_for(source)
+    with pytest.raises(ValueError, match="unavailable"):
+        asyncio.run(verifier.verify(sign(keys["k1"][0], "k1")))
+
+def test_unknown_kid_forces_a_refresh_after_rotation(keys):
+    source = FakeCertSource({"k1": keys["k1"][1]})
+    verifier = verifier_for(source)
+
+    async def scenario():
+        await verifier.verify(sign(keys["k1"][0], "k1"))
+        # Google rotates its keys before our cached set expires
+        source.certs = {"k2": keys["k2"][1]}
+        claims = await verifier.verify(sign(keys["k2"][0], "k2"))
+        # Another unknown kid right after does not fetch again
+        with pytest.raises(ValueError, match="unknown key"):
+            await verifier.verify(sign(keys["k1"][0], "k3"))
+        return claims
+
+    assert asyncio.run(scenario())["sub"] == "1"
+    assert len(source.fetches) == 2
+
+@pytest.mark.parametrize("claims, error", [
+    ({"aud": "someone-else"}, "audience"),
+    ({"iss": "https://evil.example.com"}, "issuer"),
+    ({"exp": int(time.time()) - 3600}, "expired"),
+])
+def test_claims_are_checked(keys, claims, error):
+    verifier = verifier_for(FakeCertSource({"k1": keys["k1"][1]}))
+    with pytest.raises(ValueError, match=error):
+        asyncio.run(verifier.verify(sign(keys["k1"][0], "k1", **claims)))
+    assert verifier.stats()["rejected"] == 1
+
+def test_signature_from_another_key_is_rejected(keys):
+    verifier = verifier_for(FakeCertSource({"k1": keys["k1"][1]}))
+    with pytest.raises(ValueError, match="signature"):
+        asyncio.run(verifier.verify(sign(keys["k2"][0], "k1")))
@@ -0,0 +1,117 @@
+"""ProviderRouter fallback and hedging against fake providers registered in the factory"""
+import asyncio
+from typing import List, Optional
+import pytest
+from app.ai_integration.base import AIProvider
+from app.ai_integration.factory import AIProviderFactory
+from app.ai_integration.router import ProviderRouter, ProviderUnavailable
+
+def fake_provider(name: str, calls: List[str], delay: float = 0.0, result="roadmap", error: Optional[str] = None) -> str:
+    """Register a provider answering ``result`` (or raising ``error``) after ``delay`` seconds"""
+    class FakeProvider(AIProvider):
+        cancelled = False
+
+        async def initialize(self) -> None:
+            pass
+
+        async def generate_response(self, prompt: str, **kwargs):
+            calls.append(name)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                FakeProvider.cancelled = True
+                raise
+            if error:
+                raise ValueError(error)
+            return result
+
+    AIProviderFactory.register_provider(name, FakeProvider)
+    return name
+
+def generate(provider: AIProvider):
+    return provider.generate_response("frontend developer")
+
+def run(router: ProviderRouter, **kwargs):
+    return asyncio.run(router.run(generate, **kwargs))
+
+def test_fallback_tries_the_next_provider_after_an_error():
+    calls = []
+    router = ProviderRouter([
+        fake_provider("fallback-a", calls, error="down"),
+        fake_provider("fallback-b", calls, result="from b")
+    ])
+    assert run(router) == "from b"
+    assert calls == ["fallback-a", "fallback-b"]
+    assert router.errors == {"fallback-a": 1, "fallback-b": 0}
+    assert router.wins == {"fallback-a": 0, "fallback-b": 1}
+
+def test_fallback_skips_invalid_results():
+    calls = []
+    router = ProviderRouter([
+        fake_provider("invalid-a", calls, result=[]),
+        fake_provider("invalid-b", calls, result=["topic"])
+    ])
+    assert run(router) == ["topic"]
+    assert calls == ["invalid-a", "invalid-b"]
+
+def test_fallback_never_starts_the_next_provider_while_the_first_is_running():
+    calls = []
+    router = ProviderRouter([
+        fake_provider("serial-a", calls, delay=0.05, result="from a"),
+        fake_provider("serial-b", calls, result="from b")
+    ], mode="fallback", hedge_delay=0.01, hedge_min_delay=0.01)
+    assert run(router) == "from a"
+    assert calls == ["serial-a"]
+
+def test_hedge_starts_the_next_provider_when_the_first_is_slow():
+    calls = []
+    slow = fake_provider("hedge-slow", calls, delay=1.0, result="slow")
+    fast = fake_provider("hedge-fast", calls, delay=0.01, result="fast")
+    router = ProviderRouter([slow, fast], mode="hedge", hedge_delay=0.05, hedge_min_delay=0.05)
+    assert run(router) == "fast"
+    assert calls == ["hedge-slow", "hedge-fast"]
+    assert router.hedges == 1
+    assert router.wins == {"hedge-slow": 0, "hedge-fast": 1}
+    # The losing attempt is cancelled, not counted as an error
+    assert AIProviderFactory.get_provider_class(slow).cancelled
+    assert router.errors == {"hedge-slow": 0, "hedge-fast": 0}
+
+def test_hedge_does_not_fire_when_the_first_provider_is_fast_enough():
+    calls = []
+    router = ProviderRouter([
+        fake_provider("quick-a", calls, delay=0.01, result="from a"),
+        fake_provider("quick-b", calls, result="from b")
+    ], mode="hedge", hedge_delay=0.5, hedge_min_delay=0.5)
+    assert run(router) == "from a"
+    assert calls == ["quick-a"]
+    assert router.hedges == 0
+
+def test_hedge_delay_follows_observed_latency():
+    router = ProviderRouter(["latency"], hedge_delay=8.0, hedge_min_delay=0.1, min_samples=5)
+    assert router.delay_for("latency") == 8.0
+    for _ in range(5):
+        router.latency["latency"].observe(0.3)
+    assert router.delay_for("latency") < 1.0
+
+def test_the_last_error_is_raised_when_every_provider_fails():
+    calls = []
+    router = ProviderRouter([
+        fake_provider("failing-a", calls, error="first"),
+        fake_provider("failing-b", calls, error="second")
+    ])
+    with pytest.raises(ValueError, match="second"):
+        run(router)
+
+def test_providers_without_support_are_skipped():
+    calls = []
+    router = ProviderRouter([
+        fake_provider("unsupported", calls, result="unsupported"),
+        fake_provider("supported", calls, result="supported")
+    ])
+    only_supported = lambda provider_class: provider_class is AIProviderFactory.get_provider_class("supported")
+    assert run(router, supports=only_supported) == "supported"
+    assert calls == ["supported"]
+
+    with pytest.raises(ProviderUnavailable):
+        run(router, supports=lambda provider_class: False)
+    assert router.errors == {"unsupported": 0, "supported": 0}
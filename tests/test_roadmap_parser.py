@@ -0,0 +1,165 @@
+"""RoadmapParser must build exactly the trees the original _parse_topics built
+
+The original line-by-line implementation is kept below as the reference.
+Every fixture is parsed by both, in one piece and fed in random chunks.
+"""
+import random
+import re
+import pytest
+from app.services.roadmap_parser import RoadmapParser, parse_topics
+
+def legacy_parse_topics(content):
+    topics = []
+    current_topic = None
+    current_subtopic = None
+
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        if re.match(r'^\d+\.', line):
+            if current_topic:
+                topics.append(current_topic)
+            topic_name = re.sub(r'^.*?:\s*', '', line.split('.', 1)[1].strip())
+            current_topic = {
+                "id": legacy_create_id(topic_name),
+                "title": topic_name,
+                "description": "",
+                "resources": [],
+                "children": []
+            }
+            current_subtopic = None
+
+        elif re.match(r'^[a-z]\)', line):
+            if current_topic:
+                subtopic_name = re.sub(r'^.*?:\s*', '', re.sub(r'^[a-z]\)\s*', '', line))
+                current_subtopic = {
+                    "id": legacy_create_id(subtopic_name),
+                    "title": subtopic_name,
+                    "description": "",
+                    "resources": []
+                }
+                current_topic["children"].append(current_subtopic)
+
+        elif 'Resource:' in line or 'http' in line.lower():
+            resource = legacy_parse_resource(line)
+            if current_subtopic:
+                current_subtopic["resources"].append(resource)
+            elif current_topic:
+                current_topic["resources"].append(resource)
+
+        elif line.startswith('-'):
+            description = line.lstrip('- ').strip()
+            description = re.sub(r'^Description:\s*', '', description)
+            if current_subtopic:
+                current_subtopic["description"] = description
+            elif current_topic:
+                current_topic["description"] = description
+
+    if current_topic:
+        topics.append(current_topic)
+
+    return topics
+
+def legacy_parse_resource(line):
+    resource_type = "article"
+    if "video" in line.lower() or "youtube" in line.lower():
+        resource_type = "video"
+    elif "course" in line.lower() or "tutorial" in line.lower():
+        resource_type = "course"
+
+    url_match = re.search(r'https?://[^\s]+', line)
+    url = url_match.group(0) if url_match else "https://roadmap.sh"
+
+    title_match = re.search(r'\[(.*?)\]', line)
+    if title_match:
+        title = title_match.group(1)
+    else:
+        title = line.split('Resource:', 1)[-1].split('http')[0].strip()
+        if not title:
+            title = "Learning Resource"
+
+    return {"title": title, "url": url, "type": resource_type}
+
+def legacy_create_id(title):
+    return re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
+
+GOLDEN_FIXTURES = [
+    "",
+    "Here is your learning path:\n\n- stray description\nResource: orphan https://x.dev\n",
+    """1. HTML Basics
+   - Learn the structure of web pages
+   - Resource: [MDN HTML Guide] https://developer.mozilla.org/en-US/docs/Web/HTML
+   - Subtopics:
+     a) Semantic HTML
+        - Meaning-first markup
+        - Resource: [freeCodeCamp Video] https://www.youtube.com/watch?v=kGW8Al_cga4
+     b) Forms
+        - Description: Inputs and validation
+        - Resource: https://web.dev/learn/forms
+2. Main Topic: CSS Layout
+   - Position elements on the page
+   - Resource: [Flexbox Course] https://www.udemy.com/course/flexbox
+   - Subtopics:
+     a) Subtopic: Flexbox
+        - One-dimensional layout
+        - Resource: Flexbox Froggy tutorial https://flexboxfroggy.com
+""",
+    "1. Python\r\n- Description: the language\r\n- Resource: Docs\r\na) Syntax: basics\r\n- Loops - and ifs\r\n"
+    "b) http clients\r\n3. Data.Science: Pandas\r\n   - Resource:\r\n",
+    "a) orphan subtopic\n- ignored\n1. Topic\n- Description: first\n- Description: second\n"
+    "c) Only Sub\n- Resource: [A] http://a.b [B] https://c.d video\n2.\n- 2. nested-looking\n",
+    "1. Ünïcödé Tópic\n   - Descripción con acentos\n   a) Más: Sub\n      - Recurso https://es.wikipedia.org",
+]
+
+def synthetic_roadmap(lines: int, seed: int = 3) -> str:
+    rng = random.Random(seed)
+    out = []
+    topic = 0
+    while len(out) < lines:
+        topic += 1
+        out.append(f"{topic}. Topic {topic} {rng.choice(['Basics', 'Advanced', 'Tooling'])}")
+        out.append(f"   - Learn topic {topic} in depth")
+        out.append(f"   - Resource: [Course {topic}] https://example.com/course/{topic}")
+        out.append("   - Subtopics:")
+        for sub in range(rng.randint(1, 4)):
+            letter = "abcd"[sub]
+            out.append(f"     {letter}) Subtopic {topic}{letter}")
+            out.append(f"        - Description: detail for {topic}{letter}")
+            out.append(f"        - Resource: [Video {topic}{letter}] https://youtube.com/watch?v={topic}{letter}")
+        out.append("")
+    return "\n".join(out[:lines])
+
+def chunks(text: str, rng: random.Random):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 40)
+        yield text[i:i + size]
+        i += size
+
+def flatten(topics):
+    events = []
+    for topic in topics:
+        events.append(("root", {k: v for k, v in topic.items() if k != "children"}))
+        for child in topic["children"]:
+            events.append((topic["id"], child))
+    return events
+
+FIXTURES = GOLDEN_FIXTURES + [synthetic_roadmap(n, seed=n) for n in (50, 500)]
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_whole_text_matches_legacy(fixture):
+    assert parse_topics(fixture) == legacy_parse_topics(fixture)
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_chunked_feed_matches_legacy(fixture, seed):
+    expected = legacy_parse_topics(fixture)
+    parser = RoadmapParser()
+    events = []
+    for chunk in chunks(fixture, random.Random(seed)):
+        events.extend(parser.feed(chunk))
+    events.extend(parser.close())
+    assert parser.topics == expected
+    assert events == flatten(expected)